@@ -0,0 +1,208 @@
+"""
+break_history.py
+
+Graph break history of every model across HF commits, torch versions and
+nightly builds, read from the result store.
+
+The store never overwrites a result: every explain run appends a row keyed by
+model, HF commit, torch version and Jenkins build (BUILD_NUMBER), and break
+reasons and user stacks are stored once as deduplicated strings that breaks
+refer to by id (see result_store.py). A nightly run that repeats the previous
+breaks adds a results row and a few integers per break, and diffs between two
+runs are multiset operations over normalized reasons (see break_index.py).
+
+A run of a model is selected by one or more comma-separated selectors:
+  build:42        Jenkins build 42
+  commit:3f2a9c1  an HF commit starting with 3f2a9c1
+  torch:2.7.0     torch 2.7.0 (+cpu and other local tags optional)
+  id:1234         the result with id 1234
+Exactly one run has to match, e.g. build:42,torch:2.7.0 picks one version of a
+torch matrix build; when several do, they are listed.
+
+Runs of several torch versions side by side are kept in the torch matrix store
+(see torch_matrix.py); pass --store dynamo_explain_output/torch_matrix.sqlite
+to diff them.
+
+Models that screened clean with --screen are stored as runs without breaks;
+models that failed have no run in that build.
+
+Usage:
+  # Every run of a model, oldest first
+  python break_history.py runs MODEL
+
+  # Breaks added and removed between two runs, by normalized reason; --stacks also compares user stacks
+  python break_history.py diff MODEL FROM TO [--stacks]
+
+  # First run of every model in which a reason (matched on its normalized form) appeared
+  python break_history.py first-seen REASON [--model MODEL]
+"""
+
+import json
+import argparse
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+from break_index import normalize_frame
+from break_reason_taxonomy import normalize_reason
+
+# (count, reason, innermost user frame or None)
+BreakChange = Tuple[int, str, Optional[str]]
+
+
+# GLOB, unlike LIKE, is case sensitive like commit hashes
+SELECTORS = {
+    "build": ("build = ?", lambda value: (value,)),
+    "commit": ("model_commit GLOB ?", lambda value: (value + "*",)),
+    "torch": ("(torch_version = ? OR torch_version GLOB ?)", lambda value: (value, value + "+*")),
+    "id": ("id = ?", lambda value: (int(value),)),
+}
+
+
+def resolve(store, model_name: str, revision: str):
+    """Summary of the one run of a model that matches every selector in revision, e.g. build:41,torch:2.6.0."""
+    from result_store import SUMMARY_COLUMNS, ResultSummary
+
+    conditions, params = ["model_name = ?"], [model_name]
+    for selector in revision.split(","):
+        key, _, value = selector.strip().partition(":")
+        if key not in SELECTORS or not value:
+            raise ValueError(f"Invalid selector {selector!r}, expected one of "
+                             + ", ".join(f"{key}:VALUE" for key in SELECTORS))
+        condition, to_params = SELECTORS[key]
+        conditions.append(condition)
+        params.extend(to_params(value))
+    rows = store.query(
+        f"SELECT {SUMMARY_COLUMNS} FROM results WHERE {' AND '.join(conditions)} ORDER BY created_at, id",
+        tuple(params),
+    )
+    if not rows:
+        raise KeyError(f"No run of {model_name} at {revision}")
+    if len(rows) > 1:
+        runs = "\n  ".join(describe_run(ResultSummary(*row)) for row in rows)
+        raise KeyError(f"{len(rows)} runs of {model_name} match {revision}, add a selector:\n  {runs}")
+    return ResultSummary(*rows[0])
+
+
+def _break_keys(store, result_id: int, stacks: bool) -> Tuple[Counter, Dict[tuple, int]]:
+    """Break counts of a result keyed by (normalized reason, stack id or None), and the
+    id of one exact reason text per key for display."""
+    stack = "b.stack_id" if stacks else "NULL"
+    counts, examples = Counter(), {}
+    for normalized, stack_id, count, reason_id in store.query(
+        f"SELECT i.normalized, {stack}, COUNT(*), MIN(b.reason_id) FROM breaks b"
+        " JOIN reason_index i ON i.reason_id = b.reason_id WHERE b.result_id = ? GROUP BY 1, 2",
+        (result_id,),
+    ):
+        counts[normalized, stack_id] = count
+        examples[normalized, stack_id] = reason_id
+    return counts, examples
+
+
+def _describe(store, changes: Counter, examples: Dict[tuple, int]) -> List[BreakChange]:
+    if not changes:
+        return []
+    ids = {examples[key] for key in changes} | {stack_id for _, stack_id in changes if stack_id is not None}
+    texts = dict(store.query(
+        f"SELECT id, text FROM strings WHERE id IN ({', '.join('?' * len(ids))})", tuple(ids)
+    ))
+    described = []
+    for key, count in changes.items():
+        stack_id = key[1]
+        frame = None
+        if stack_id is not None:
+            frames = [normalize_frame(entry) for entry in json.loads(texts[stack_id])]
+            frame = next((f for f in reversed(frames) if f is not None), None)
+        described.append((count, texts[examples[key]], frame))
+    return sorted(described, key=lambda change: (-change[0], change[1]))
+
+
+def diff(store, old_id: int, new_id: int, stacks: bool = False) -> Tuple[List[BreakChange], List[BreakChange]]:
+    """(added, removed) breaks from result old_id to new_id.
+
+    Breaks are compared by normalized reason, like the break index, so a reason
+    that only changed a size or a name is not churn; with stacks=True they are
+    also compared by user stack. A reason that occurs more often in one run
+    counts as added or removed that many times, shown with its text in the run
+    that has it.
+    """
+    old, old_examples = _break_keys(store, old_id, stacks)
+    new, new_examples = _break_keys(store, new_id, stacks)
+    return _describe(store, new - old, new_examples), _describe(store, old - new, old_examples)
+
+
+def first_seen(store, reason: str, model_name: Optional[str] = None) -> List:
+    """Summary of the first run of every model that had a break with `reason` once normalized.
+
+    Runs are ordered by creation time rather than id, since merged shards and
+    torch matrix runs are not appended in the order they ran.
+    """
+    from result_store import SUMMARY_COLUMNS, ResultSummary
+
+    model_filter, params = "", (normalize_reason(reason),)
+    if model_name is not None:
+        model_filter, params = " AND model_name = ?", params + (model_name,)
+    rows = store.query(
+        f"SELECT {SUMMARY_COLUMNS} FROM ("
+        " SELECT *, ROW_NUMBER() OVER (PARTITION BY model_family, model_name ORDER BY created_at, id) AS n"
+        " FROM results WHERE id IN ("
+        "  SELECT b.result_id FROM reason_index i JOIN breaks b ON b.reason_id = i.reason_id"
+        "  WHERE i.normalized = ?)" + model_filter +
+        ") WHERE n = 1 ORDER BY created_at, id",
+        params,
+    )
+    return [ResultSummary(*row) for row in rows]
+
+
+def describe_run(summary) -> str:
+    return (f"#{summary.id} build {summary.build or '-'} commit {(summary.model_commit or '-')[:7]}"
+            f" torch {summary.torch_version or '-'}")
+
+
+def _print_changes(sign: str, changes: List[BreakChange]):
+    for count, reason, frame in changes:
+        print(f"  {sign}{count:<4d} {reason}" + (f"\n         at {frame}" if frame else ""))
+
+
+def main():
+    from result_store import DEFAULT_STORE_PATH, ResultStore
+
+    parser = argparse.ArgumentParser(description="Graph break history of models across commits and builds.")
+    parser.add_argument('--store', default=DEFAULT_STORE_PATH,
+                        help='Path of the result store')
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    runs = subparsers.add_parser("runs", help="Every run of a model")
+    runs.add_argument('model')
+    changes = subparsers.add_parser("diff", help="Breaks added and removed between two runs of a model")
+    changes.add_argument('model')
+    changes.add_argument('old', metavar='FROM', help='Selectors of one run, e.g. build:41 or commit:3f2a9c1,torch:2.6.0')
+    changes.add_argument('new', metavar='TO', help='Selectors of one run, e.g. build:42')
+    changes.add_argument('--stacks', action='store_true',
+                         help='Also tell apart breaks with the same reason but different user stacks')
+    seen = subparsers.add_parser("first-seen", help="First run in which each model had a break reason")
+    seen.add_argument('reason')
+    seen.add_argument('--model', default=None,
+                      help='Only this model')
+    args = parser.parse_args()
+
+    with ResultStore(args.store) as store:
+        if args.command == "runs":
+            for summary in store.history(args.model):
+                print(f"{describe_run(summary)}  {summary.graph_break_count} break(s)")
+        elif args.command == "diff":
+            try:
+                old = resolve(store, args.model, args.old)
+                new = resolve(store, args.model, args.new)
+            except (KeyError, ValueError) as e:
+                parser.error(e.args[0])
+            added, removed = diff(store, old.id, new.id, args.stacks)
+            print(f"{args.model}: {describe_run(old)} -> {describe_run(new)}")
+            print(f"[+] {sum(c for c, _, _ in added)} break(s) added, {sum(c for c, _, _ in removed)} removed")
+            _print_changes("+", added)
+            _print_changes("-", removed)
+        else:
+            for summary in first_seen(store, args.reason, args.model):
+                print(f"{summary.model_family}/{summary.model_name}: {describe_run(summary)}")
+
+
+if __name__ == '__main__':
+    main()
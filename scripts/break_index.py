@@ -0,0 +1,177 @@
+"""
+break_index.py
+
+Cross-model inverted index over graph breaks, kept in the result store.
+
+The store keeps every distinct break reason and user stack once (see
+result_store.py), and each is indexed when it is first stored:
+  reason_index  the reason normalized with break_reason_taxonomy.normalize_reason,
+                so reasons that differ only in numbers, addresses or quoted
+                names share one key
+  frame_index   every frame of the stack as file:line:function, with the
+                file path cut down to the part after site-packages/ (e.g.
+                transformers/models/bert/modeling_bert.py:112:forward)
+
+Both are plain indexed SQLite tables joined to the breaks of every result, so
+queries are answered from the index without loading any result payload, and
+nightly runs that repeat known breaks do not grow the index.
+
+Usage:
+  # Rebuild the index, e.g. after changing the normalization rules
+  python break_index.py build
+
+  # Models that break in a frame; NNN or * match any line or function
+  python break_index.py frame "transformers/models/bert/modeling_bert.py:NNN"
+
+  # Models with a reason (matched on its normalized form)
+  python break_index.py reason "call_function torch.arange with dynamic size"
+
+  # Frames and normalized reasons by number of breaking models
+  python break_index.py top-frames [-k 20]
+  python break_index.py top-reasons [-k 20]
+
+Add --latest to only consider the newest result of every model.
+"""
+
+import re
+import html
+import argparse
+from typing import Iterable, List, Optional, Tuple
+
+from break_reason_taxonomy import normalize_reason
+
+# str(FrameSummary), traceback lines, and plain file:line[:function]
+_FRAME_PATTERNS = [
+    re.compile(r"<FrameSummary file (?P<file>.+?), line (?P<line>\d+) in (?P<func>[^>\s]+)>"),
+    re.compile(r"File \"(?P<file>.+?)\", line (?P<line>\d+), in (?P<func>\S+)"),
+    re.compile(r"^(?P<file>[^:\s]+):(?P<line>\d+)(?::(?P<func>\S+))?$"),
+]
+_PACKAGE_ROOT = re.compile(r".*/(?:site|dist)-packages/")
+
+LATEST_RESULTS = "SELECT MAX(id) FROM results GROUP BY model_family, model_name"
+
+
+def normalize_frame(frame: str) -> Optional[str]:
+    """file:line:function of one user stack entry, or None if it is not a frame."""
+    text = html.unescape(frame).strip()
+    for pattern in _FRAME_PATTERNS:
+        match = pattern.search(text)
+        if match:
+            path = _PACKAGE_ROOT.sub("", match.group("file").replace("\\", "/"))
+            return f"{path}:{match.group('line')}:{match.group('func') or '?'}"
+    return None
+
+
+def index_reason(reason_id: int, reason: str) -> Tuple[str, int]:
+    """reason_index row of one distinct break reason."""
+    return normalize_reason(reason), reason_id
+
+
+def index_stack(stack_id: int, user_stack: Iterable[str]) -> List[Tuple[str, int, int]]:
+    """frame_index rows of one distinct user stack."""
+    frames = []
+    for depth, frame in enumerate(user_stack or []):
+        normalized = normalize_frame(frame)
+        if normalized is not None:
+            frames.append((normalized, stack_id, depth))
+    return frames
+
+
+def _frame_pattern(pattern: str) -> str:
+    """Turn a query like path.py:NNN or path.py:*:forward into a GLOB pattern."""
+    # GLOB (unlike LIKE) is case sensitive, so a literal prefix can use the frame index
+    glob = pattern.replace("[", "[[]").replace("?", "[?]")
+    glob = re.sub(r"NNN", "*", glob)
+    # path.py:112 matches any function at that line, path.py any line
+    if glob.count(":") < 2:
+        glob += ":*" if ":" in glob else ":*:*"
+    return glob
+
+
+def _scope(latest: bool) -> str:
+    return f" AND r.id IN ({LATEST_RESULTS})" if latest else ""
+
+
+def models_at_frame(store, pattern: str, latest: bool = False) -> List[Tuple[str, str, int]]:
+    """(model_family, model_name, break count) of models breaking at a frame pattern."""
+    return store.query(
+        "SELECT r.model_family, r.model_name, COUNT(*) FROM frame_index f"
+        " JOIN breaks b ON b.stack_id = f.stack_id JOIN results r ON r.id = b.result_id"
+        " WHERE f.frame GLOB ?" + _scope(latest) +
+        " GROUP BY r.model_family, r.model_name ORDER BY COUNT(*) DESC, r.model_name",
+        (_frame_pattern(pattern),),
+    )
+
+
+def models_with_reason(store, reason: str, latest: bool = False) -> List[Tuple[str, str, int]]:
+    """(model_family, model_name, break count) of models with a reason equal to `reason` once normalized."""
+    return store.query(
+        "SELECT r.model_family, r.model_name, COUNT(*) FROM reason_index i"
+        " JOIN breaks b ON b.reason_id = i.reason_id JOIN results r ON r.id = b.result_id"
+        " WHERE i.normalized = ?" + _scope(latest) +
+        " GROUP BY r.model_family, r.model_name ORDER BY COUNT(*) DESC, r.model_name",
+        (normalize_reason(reason),),
+    )
+
+
+def top_frames(store, k: int = 20, latest: bool = False) -> List[Tuple[str, int]]:
+    """The k frames that the most distinct models break in."""
+    return store.query(
+        "SELECT f.frame, COUNT(DISTINCT r.model_family || '/' || r.model_name) AS models"
+        " FROM frame_index f JOIN breaks b ON b.stack_id = f.stack_id"
+        " JOIN results r ON r.id = b.result_id"
+        " WHERE 1" + _scope(latest) +
+        " GROUP BY f.frame ORDER BY models DESC, f.frame LIMIT ?",
+        (k,),
+    )
+
+
+def top_reasons(store, k: int = 20, latest: bool = False) -> List[Tuple[str, int]]:
+    """The k normalized reasons shared by the most distinct models."""
+    return store.query(
+        "SELECT i.normalized, COUNT(DISTINCT r.model_family || '/' || r.model_name) AS models"
+        " FROM reason_index i JOIN breaks b ON b.reason_id = i.reason_id"
+        " JOIN results r ON r.id = b.result_id"
+        " WHERE 1" + _scope(latest) +
+        " GROUP BY i.normalized ORDER BY models DESC, i.normalized LIMIT ?",
+        (k,),
+    )
+
+
+def main():
+    from result_store import DEFAULT_STORE_PATH, ResultStore
+
+    parser = argparse.ArgumentParser(description="Query graph breaks across all stored results.")
+    parser.add_argument('--store', default=DEFAULT_STORE_PATH,
+                        help='Path of the result store')
+    parser.add_argument('--latest', action='store_true',
+                        help='Only consider the newest result of every model')
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("build", help="Rebuild the index of every stored reason and stack")
+    frame = subparsers.add_parser("frame", help="Models breaking at a file:line[:function] frame")
+    frame.add_argument('pattern')
+    reason = subparsers.add_parser("reason", help="Models with a break reason")
+    reason.add_argument('reason')
+    for name in ("top-frames", "top-reasons"):
+        top = subparsers.add_parser(name, help=f"{name.split('-')[1].capitalize()} by number of breaking models")
+        top.add_argument('-k', type=int, default=20)
+    args = parser.parse_args()
+
+    with ResultStore(args.store) as store:
+        if args.command == "build":
+            print(f"[+] Indexed {store.reindex_breaks()} distinct reason(s) and stack(s)")
+        elif args.command in ("frame", "reason"):
+            if args.command == "frame":
+                rows = models_at_frame(store, args.pattern, args.latest)
+            else:
+                rows = models_with_reason(store, args.reason, args.latest)
+            for model_family, model_name, count in rows:
+                print(f"{count:6d}  {model_family}/{model_name}")
+        else:
+            query = top_frames if args.command == "top-frames" else top_reasons
+            for key, models in query(store, args.k, args.latest):
+                print(f"{models:6d}  {key}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+"""
+break_reason_taxonomy.py
+
+Maps raw graph break reasons to a small, bounded set of categories so they can
+be used as Prometheus label values. Reasons are matched against ordered pattern
+rules; anything unmatched lands in one of OVERFLOW_BUCKETS hashed "other"
+buckets. The hash is taken over the reason with numbers, addresses and quoted
+names stripped, so the same limitation always lands in the same bucket.
+
+The full reason text is not exported as a metric label; it only goes to the
+Loki log next to its category.
+"""
+
+import re
+import html
+import zlib
+from typing import List, Pattern, Tuple
+
+OVERFLOW_BUCKETS = 16
+
+# (pattern, category), first match wins
+RULES: List[Tuple[Pattern, str]] = [(re.compile(pattern, re.IGNORECASE), category) for pattern, category in [
+    (r"torch\._dynamo\.graph_break|graph_break\(\)|explicit graph break", "explicit graph break"),
+    (r"data[- ]dependent (jump|branch|control flow)|generic_jump|jump on tensor", "data-dependent control flow"),
+    (r"\.item\(\)|tensor\.item|_local_scalar_dense|data[- ]dependent operator|unbacked symint", "data-dependent operator"),
+    (r"dynamic shape operator|dynamic size|dynamic shape", "dynamic shape"),
+    (r"numpy|np\.ndarray", "numpy interop"),
+    (r"print\b|builtins\.print", "print call"),
+    (r"logging|logger\.", "logging call"),
+    (r"warnings\.warn|userwarning", "warnings call"),
+    (r"autograd\.function", "autograd.Function"),
+    (r"hook", "module hooks"),
+    (r"context manager|__enter__|__exit__", "unsupported context manager"),
+    (r"generator|yield", "generator"),
+    (r"skip_?files|skipfiles|inline in skip|marked as skipped|torch\._dynamo\.disable", "call to skipped function"),
+    (r"builtin|builtinvariable", "call_function on builtin"),
+    (r"call_method", "unsupported method call"),
+    (r"setattr|store_attr|attribute mutation|mutating", "attribute mutation"),
+    (r"non-tensor|returned non-tensor|non-const", "non-Tensor value"),
+    (r"unsupported (op|operator)|not supported|unsupported aten|no fake impl|missing fake", "unsupported op"),
+    (r"user-?defined class|userdefinedclassvariable|userdefinedobjectvariable", "user-defined object"),
+    (r"recompil|cache_size_limit|cache limit", "recompilation limit"),
+]]
+
+_NOISE = re.compile(r"0x[0-9a-f]+|\d+|'[^']*'|\"[^\"]*\"|<[^>]*>")
+
+
+def normalize_reason(reason: str) -> str:
+    """Strip addresses, numbers and quoted names so near-identical reasons compare equal."""
+    text = html.unescape(reason).lower()
+    text = _NOISE.sub("#", text)
+    return " ".join(text.split())
+
+
+def categorize(reason: str) -> str:
+    """Return the bounded category label for a raw (possibly HTML-escaped) break reason."""
+    text = html.unescape(reason)
+    for pattern, category in RULES:
+        if pattern.search(text):
+            return category
+    bucket = zlib.crc32(normalize_reason(reason).encode()) % OVERFLOW_BUCKETS
+    return f"other ({bucket:02d})"
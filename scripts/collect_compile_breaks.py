@@ -1,23 +1,58 @@
+"""
+collect_compile_breaks.py
+
+Streams the latest explain result of every model from the result store (and
+any legacy .pkl results not yet converted into it) through a pool of decoder
+processes, records break reasons, break counts, compile times and per-phase
+compile time histograms in one
+Prometheus registry and pushes it to the Pushgateway once per run (or every
+--chunk-size models). The whole registry is also written to a single
+textfile-collector file.
+
+--since restricts decoding and Loki logging to results newer than a
+timestamp; `--since last` uses the time of the last collection without
+failures. Every push replaces the whole group, so the newest stored result of
+every other model is still exported, read from its summary rows without
+logging its break reasons again. Legacy .pkl results are only read when new.
+
+If torch_matrix.py has run, the newest break count and compile time of every
+model under every torch version it covered are exported as well, labelled by
+torch_version.
+
+Usage:
+  python scripts/collect_compile_breaks.py [--chunk-size N] [--pushgateway URL]
+                                           [--workers W] [--since last|EPOCH|ISO-8601]
+"""
+
 import time
 import os
-import pickle
+import argparse
+from datetime import datetime
 from pathlib import Path
-from prometheus_client import CollectorRegistry, Counter, Gauge, push_to_gateway, generate_latest
-from dynamo_explain_parser import DynamoExplainData
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, push_to_gateway, generate_latest
+from result_store import TORCH_MATRIX_STORE_PATH, ResultStore
+from result_ingest import IngestedResult, decode_store_result, ingest, walk_results
+from loki_log_sink import LokiLogSink
+from break_reason_taxonomy import categorize
 
 input_dir = Path("scripts/dynamo_explain_output")
 output_dir = Path("scripts/metrics")
 output_dir.mkdir(parents=True, exist_ok=True)
 
-PUSHGATEWAY_URL = "http://pushgateway:9091"
+PUSHGATEWAY_URL = os.getenv("PUSHGATEWAY_URL", "http://pushgateway:9091")
+PROM_FILE = output_dir / "compile_breaks.prom"
+LAST_COLLECTION_FILE = output_dir / ".last_collection"
+
+# one buffered handle per Loki log file for the whole run
+log_sink = LokiLogSink()
 
 # group and isolate metrics in its own registry
 registry = CollectorRegistry()
 
 break_reasons_counter = Counter(
     "break_reasons_counter",
-    "Break reasons per model",
-    ["model_family", "model_name", "reason"],
+    "Break reasons per model, by bounded reason category",
+    ["model_family", "model_name", "reason_category"],
     registry=registry
 )
 
@@ -35,56 +70,189 @@ compile_time_gauge = Gauge(
     registry=registry
 )
 
+compile_speedup_gauge = Gauge(
+    "compile_speedup_ratio",
+    "Eager p50 latency divided by torch.compile p50 latency",
+    ["model_family", "model_name"],
+    registry=registry
+)
+
+torch_version_break_count_gauge = Gauge(
+    "graph_break_count_by_torch_version",
+    "Total number of graph breaks per model under each torch version of the torch matrix",
+    ["model_family", "model_name", "torch_version"],
+    registry=registry
+)
+
+torch_version_compile_time_gauge = Gauge(
+    "compile_time_seconds_by_torch_version",
+    "Time taken to compile a model under each torch version of the torch matrix",
+    ["model_family", "model_name", "torch_version"],
+    registry=registry
+)
+
+# Compile times range from tens of milliseconds per frame to tens of minutes per model
+COMPILE_SECONDS_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+
+compile_phase_histogram = Histogram(
+    "compile_phase_seconds",
+    "Per-model compile time spent in each phase (dynamo_tracing, backend_compile, aot_autograd, inductor_*)",
+    ["model_family", "phase"],
+    buckets=COMPILE_SECONDS_BUCKETS,
+    registry=registry
+)
+
+graph_compile_histogram = Histogram(
+    "graph_compile_seconds",
+    "Compile time of each compiled frame (graph)",
+    ["model_family"],
+    buckets=COMPILE_SECONDS_BUCKETS,
+    registry=registry
+)
+
 def record(model_family, model_name, reason, log_file):
-    # increment Prometheus counter
-    break_reasons_counter.labels(model_family, model_name, reason).inc()
+    # increment Prometheus counter; only the category is a label, the full text goes to Loki
+    reason_category = categorize(reason)
+    break_reasons_counter.labels(model_family, model_name, reason_category).inc()
 
     # append to Loki log
     ts = int(time.time()*1e9)
-    log_file.open("a").write(
-        f"INFO: time={ts} model_family={model_family} model_name={model_name} reason=\"{reason}\"\n"
-    )
+    log_sink.write(log_file, time=ts, model_family=model_family, model_name=model_name,
+                   reason_category=reason_category, reason=reason)
 
-def flush(job_name="compile_breaks", grouping_key=None):
+def flush(job_name="compile_breaks", grouping_key=None, gateway=PUSHGATEWAY_URL):
+    """Push the whole registry once; returns (payload bytes, seconds taken)."""
+    payload_size = len(generate_latest(registry))
+    start = time.perf_counter()
     push_to_gateway(
-        PUSHGATEWAY_URL,
+        gateway,
         job=job_name,  # top-level name in Pushgateway
         grouping_key=grouping_key,  # job + grouping_key is the composite key
         registry=registry,
     )
+    return payload_size, time.perf_counter() - start
+
+
+def record_torch_matrix(store_path=TORCH_MATRIX_STORE_PATH):
+    """Set the per-torch-version gauges from the torch matrix store; returns the number of results."""
+    if not os.path.exists(store_path):
+        return 0
+    with ResultStore(store_path) as store:
+        summaries = store.summaries(latest_only=True, per_torch_version=True)
+    for summary in summaries:
+        labels = (summary.model_family, summary.model_name.replace("/", "--"), summary.torch_version or "unknown")
+        torch_version_break_count_gauge.labels(*labels).set(summary.graph_break_count)
+        if summary.compile_time is not None:
+            torch_version_compile_time_gauge.labels(*labels).set(summary.compile_time)
+    return len(summaries)
+
+
+def parse_since(value):
+    """Turn a --since argument into an epoch timestamp (None means ingest everything)."""
+    if value is None:
+        return None
+    if value == "last":
+        if not LAST_COLLECTION_FILE.exists():
+            return None
+        return float(LAST_COLLECTION_FILE.read_text().strip())
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record compile-break metrics and logs for Grafana.")
+    parser.add_argument('--chunk-size', type=int, default=0,
+                        help='Push after every N models (default: push once at the end)')
+    parser.add_argument('--pushgateway', default=PUSHGATEWAY_URL,
+                        help='Pushgateway address')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Number of decoder processes (default: one per CPU)')
+    parser.add_argument('--max-in-flight', type=int, default=64,
+                        help='Maximum number of results being decoded at once')
+    parser.add_argument('--since', default=None,
+                        help="Only ingest results newer than this: 'last', epoch seconds or ISO-8601")
+    args = parser.parse_args()
+
+    grouping_key = {"pipeline": os.getenv("BUILD_NUMBER")}
+    pushes = []
+
+    def push():
+        payload_size, seconds = flush(grouping_key=grouping_key, gateway=args.pushgateway)
+        pushes.append((payload_size, seconds))
+        print(f"[+] Pushed {payload_size} bytes to {args.pushgateway} in {seconds * 1000:.1f} ms")
+
+    models = 0
+    collected = set()
 
-# Scan the directory structure
-for model_family_dir in input_dir.iterdir():
-    if model_family_dir.is_dir():
-        model_family = model_family_dir.name
-        for pkl_file in model_family_dir.glob("*.pkl"):
-            # Extract model name from filename
-            try:
-                model_name = pkl_file.stem.replace("_dynamo_explain", "")
-            except ValueError:
-                print(f"Skipping improperly named file: {pkl_file}")
-                continue
-
-            # Load the pickled DynamoExplainData
-            with pkl_file.open("rb") as f:
-                try:
-                    data: DynamoExplainData = pickle.load(f)
-                except Exception as e:
-                    print(f"Failed to load {pkl_file}: {e}")
-                    continue
-
-            prom_file = output_dir / f"{model_family}_{model_name}_compile_breaks.prom"
+    def aggregate(result: IngestedResult, log: bool = True):
+        nonlocal models
+        collected.add((result.model_family, result.model_name))
+        model_family = result.model_family
+        # Keep the historical file-name style label values, e.g. facebook--dinov2-small
+        model_name = result.model_name.replace("/", "--")
+
+        if log:
             log_file = output_dir / f"{model_family}_{model_name}_compile_breaks.log"
+            for reason in result.reasons:
+                record(model_family, model_name, reason, log_file)
+        else:
+            for reason in result.reasons:
+                break_reasons_counter.labels(model_family, model_name, categorize(reason)).inc()
+
+        if result.compile_time is not None:
+            compile_time_gauge.labels(model_family, model_name).set(result.compile_time)
+
+        graph_break_count_gauge.labels(model_family, model_name).set(result.graph_break_count)
+
+        if result.speedup is not None:
+            compile_speedup_gauge.labels(model_family, model_name).set(result.speedup)
+
+        for phase, seconds in (result.compile_phases or {}).items():
+            compile_phase_histogram.labels(model_family, phase).observe(seconds)
+        for seconds in result.graph_compile_times or []:
+            graph_compile_histogram.labels(model_family).observe(seconds)
+
+        models += 1
+        if args.chunk_size and models % args.chunk_size == 0:
+            push()
+
+    started_at = time.time()
+    since = parse_since(args.since)
+    # Only summary columns and break reasons are read; graphs, guards and stacks stay in the store
+    with ResultStore() as store:
+        ingested, failed = ingest(walk_results(store, input_dir, since), aggregate,
+                                  workers=args.workers, max_in_flight=args.max_in_flight)
+        if since is not None:
+            for summary in store.summaries(latest_only=True):
+                if (summary.model_family, summary.model_name) not in collected:
+                    aggregate(decode_store_result(store.path, summary.id), log=False)
+
+    log_sink.close()
+
+    matrix_results = record_torch_matrix()
+    if matrix_results:
+        print(f"[+] Recorded {matrix_results} torch matrix result(s)")
+
+    if not pushes or models % args.chunk_size:
+        push()
 
-            for break_reason in data.break_reasons:
-                record(model_family, model_name, break_reason.reason, log_file)
+    # One consolidated textfile-collector file for the whole run
+    with PROM_FILE.open("wb") as f:
+        f.write(generate_latest(registry))
 
-            if data.compile_times:
-                compile_time_gauge.labels(model_family, model_name).set(data.compile_times.total_time)
+    total_bytes = sum(size for size, _ in pushes)
+    total_seconds = sum(seconds for _, seconds in pushes)
+    print(f"[+] Collected {models} models ({models - ingested} unchanged, {failed} failed): "
+          f"{len(pushes)} push(es), {total_bytes} bytes, {total_seconds * 1000:.1f} ms total push latency")
 
-            graph_break_count_gauge.labels(model_family, model_name).set(data.graph_break_count)
+    # Reaching this point means every push succeeded; failed results are retried next time
+    if failed:
+        print(f"[!] Not advancing {LAST_COLLECTION_FILE.name}, {failed} result(s) failed to load")
+    else:
+        LAST_COLLECTION_FILE.write_text(str(started_at))
 
-            flush(grouping_key={"pipeline": os.getenv("BUILD_NUMBER")})
 
-            with prom_file.open("w") as f:
-                f.write(generate_latest().decode())
+if __name__ == '__main__':
+    main()
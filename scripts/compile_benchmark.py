@@ -0,0 +1,246 @@
+"""
+compile_benchmark.py
+
+Compile-time benchmark for the pinned reference set of models in
+REFERENCE_MODELS (or just the ones passed with --models), each of which must
+have pickled inputs under inputs/<family>/*.pkl.
+
+For each model three timings are taken:
+  explain        dynamo.explain(model)(**inputs) after torch._dynamo.reset(),
+                 the pipeline's own workload
+  compile_cold   first call of torch.compile(model) in a fresh interpreter with
+                 empty Inductor and Triton cache directories
+  compile_warm   the same in a fresh interpreter whose Inductor and Triton
+                 caches were populated by an earlier run, i.e. compile time on
+                 an on-disk cache hit
+
+Compile trials never share a process, so no in-memory cache (dynamo's, the
+code caches, Triton's) carries over from one trial to the next.
+
+Each timing gets --warmup discarded runs and --trials measured runs, and is
+reported as the median with a bootstrapped 95% confidence interval.
+
+Medians are compared against the baseline (compile_benchmark_baseline.json)
+once one is committed. Record it on the benchmark agent, with the torch
+pinned in requirements.txt:
+  python compile_benchmark.py --update-baseline
+and commit the file. Until then the results are only reported. With a
+baseline, the run fails (exit code 1) when a median regresses by more than
+--threshold and the whole confidence interval is above the baseline, or when
+a benchmarked model has no baseline entry.
+
+Usage:
+  python compile_benchmark.py [--models ID ...] [--trials 5] [--warmup 1]
+                              [--baseline compile_benchmark_baseline.json]
+                              [--threshold 0.1] [--update-baseline]
+                              [--output compile_benchmark_results.json]
+"""
+
+import os
+import sys
+import json
+import time
+import pickle
+import random
+import argparse
+import tempfile
+import statistics
+import subprocess
+from typing import Dict, List, Tuple
+
+from dynamo_explain_creator import find_jobs
+
+# Models the compile-time gate is defined on; changing this list needs a new baseline
+REFERENCE_MODELS = (
+    "facebook/mms-tts-rus",
+)
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "compile_benchmark_baseline.json")
+RESULTS_FILE = "compile_benchmark_results.json"
+METRICS = ("explain", "compile_cold", "compile_warm")
+
+
+def median_ci(samples: List[float], confidence: float = 0.95, resamples: int = 2000,
+              seed: int = 0) -> Tuple[float, float, float]:
+    """Median of samples and a percentile-bootstrap confidence interval around it."""
+    rng = random.Random(seed)
+    medians = sorted(
+        statistics.median(rng.choices(samples, k=len(samples))) for _ in range(resamples)
+    )
+    tail = (1 - confidence) / 2
+    low = medians[int(tail * (resamples - 1))]
+    high = medians[int((1 - tail) * (resamples - 1))]
+    return statistics.median(samples), low, high
+
+
+def time_explain(model, inputs) -> float:
+    import torch._dynamo as dynamo
+
+    dynamo.reset()
+    start = time.perf_counter()
+    dynamo.explain(model)(**inputs)
+    return time.perf_counter() - start
+
+
+def compile_trial(model_name: str, input_path: str):
+    """Body of one compile trial (--compile-trial): print the first-call torch.compile time as JSON."""
+    import torch
+    from model_loader import load_model
+
+    with open(input_path, "rb") as f:
+        inputs = pickle.load(f)
+    model = load_model(model_name)
+    model.eval()
+    with torch.no_grad():
+        compiled = torch.compile(model)
+        start = time.perf_counter()
+        compiled(**inputs)
+        seconds = time.perf_counter() - start
+    print(json.dumps({"seconds": seconds}))
+
+
+def time_compile(model_name: str, input_path: str, cache_dir: str) -> float:
+    """First-call torch.compile time in a fresh interpreter with its Inductor and Triton caches under cache_dir."""
+    env = dict(os.environ,
+               TORCHINDUCTOR_CACHE_DIR=os.path.join(cache_dir, "inductor"),
+               TRITON_CACHE_DIR=os.path.join(cache_dir, "triton"))
+    try:
+        out = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--compile-trial", model_name, os.path.abspath(input_path)],
+            env=env, check=True, capture_output=True, text=True,
+        ).stdout
+    except subprocess.CalledProcessError as e:
+        raise RuntimeError(f"compile trial failed: {e.stderr[-2000:]}") from e
+    return json.loads(out.strip().splitlines()[-1])["seconds"]
+
+
+def benchmark_model(model, model_name: str, input_path: str, inputs,
+                    trials: int, warmup: int) -> Dict[str, List[float]]:
+    samples = {metric: [] for metric in METRICS}
+    with tempfile.TemporaryDirectory(prefix="compile_warm_") as warm_cache:
+        # Populate the warm cache so every warm trial is a cache hit
+        time_compile(model_name, input_path, warm_cache)
+        for trial in range(warmup + trials):
+            explain_time = time_explain(model, inputs)
+            with tempfile.TemporaryDirectory(prefix="compile_cold_") as cold_cache:
+                cold_time = time_compile(model_name, input_path, cold_cache)
+            warm_time = time_compile(model_name, input_path, warm_cache)
+            if trial >= warmup:
+                samples["explain"].append(explain_time)
+                samples["compile_cold"].append(cold_time)
+                samples["compile_warm"].append(warm_time)
+    return samples
+
+
+def summarize(samples: Dict[str, List[float]]) -> Dict[str, dict]:
+    summary = {}
+    for metric, values in samples.items():
+        median, low, high = median_ci(values)
+        summary[metric] = {"median": median, "ci_low": low, "ci_high": high, "samples": values}
+    return summary
+
+
+def find_regressions(results: Dict[str, dict], baseline: Dict[str, dict],
+                     threshold: float) -> List[str]:
+    regressions = []
+    for model_name, metrics in results.items():
+        for metric, stats in metrics.items():
+            reference = baseline.get(model_name, {}).get(metric)
+            if reference is None:
+                regressions.append(f"{model_name} {metric}: no baseline")
+                continue
+            if stats["median"] > reference * (1 + threshold) and stats["ci_low"] > reference:
+                regressions.append(
+                    f"{model_name} {metric}: {stats['median']:.2f}s vs baseline {reference:.2f}s "
+                    f"(+{(stats['median'] / reference - 1) * 100:.0f}%)"
+                )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark compile time on the reference models.")
+    parser.add_argument('--models', nargs='*', default=list(REFERENCE_MODELS),
+                        help='Model ids to benchmark (default: REFERENCE_MODELS)')
+    parser.add_argument('--trials', type=int, default=5,
+                        help='Measured trials per model')
+    parser.add_argument('--warmup', type=int, default=1,
+                        help='Discarded warmup trials per model')
+    parser.add_argument('--baseline', default=BASELINE_FILE,
+                        help='Baseline file to compare against')
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help='Allowed relative regression of a median before failing')
+    parser.add_argument('--update-baseline', action='store_true',
+                        help='Write the measured medians as the new baseline')
+    parser.add_argument('--output', default=RESULTS_FILE,
+                        help='Where to write the full results')
+    parser.add_argument('--compile-trial', nargs=2, metavar=('MODEL', 'INPUT_PATH'),
+                        help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.compile_trial:
+        compile_trial(*args.compile_trial)
+        return
+
+    import torch
+    from model_loader import load_model
+
+    jobs = [job for job in find_jobs() if job[1] in args.models]
+    missing = sorted(set(args.models) - {job[1] for job in jobs})
+    if missing:
+        print(f"[!] No inputs under inputs/ for: {', '.join(missing)}")
+        sys.exit(1)
+    results = {}
+    for model_family, model_name, input_path in jobs:
+        print(f"[*] Benchmarking {model_name}")
+        with open(input_path, "rb") as f:
+            inputs = pickle.load(f)
+        try:
+            model = load_model(model_name)
+            model.eval()
+            samples = benchmark_model(model, model_name, input_path, inputs, args.trials, args.warmup)
+        except Exception as e:
+            print(f"[!] Failed to benchmark {model_name}: {e}")
+            continue
+        results[model_name] = summarize(samples)
+        for metric, stats in results[model_name].items():
+            print(f"    {metric:13s} {stats['median']:8.3f}s  [{stats['ci_low']:.3f}, {stats['ci_high']:.3f}]")
+
+    with open(args.output, "w") as f:
+        json.dump({"torch_version": torch.__version__, "results": results}, f, indent=2)
+    print(f"[+] Saved benchmark results to {args.output}")
+
+    if args.update_baseline:
+        baseline = {
+            "torch_version": torch.__version__,
+            "models": {
+                model_name: {metric: stats["median"] for metric, stats in metrics.items()}
+                for model_name, metrics in results.items()
+            },
+        }
+        with open(args.baseline, "w") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+        print(f"[+] Updated baseline {args.baseline}")
+        return
+
+    if len(results) < len(jobs):
+        print("[!] Not every reference model could be benchmarked")
+        sys.exit(1)
+    if not os.path.exists(args.baseline):
+        print(f"[*] No baseline at {args.baseline}, not checking for regressions; "
+              "record one with --update-baseline and commit it")
+        return
+    with open(args.baseline, "r") as f:
+        baseline = json.load(f)
+    if baseline.get("torch_version") != torch.__version__:
+        print(f"[*] Baseline was recorded with torch {baseline.get('torch_version')}, running {torch.__version__}")
+    regressions = find_regressions(results, baseline.get("models", {}), args.threshold)
+    if regressions:
+        print("[!] Compile time regressions:")
+        for line in regressions:
+            print(f"    {line}")
+        sys.exit(1)
+    print("[+] No compile time regressions")
+
+
+if __name__ == '__main__':
+    main()
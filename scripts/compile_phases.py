@@ -0,0 +1,84 @@
+"""
+compile_phases.py
+
+Structured per-phase compile timings taken from torch._dynamo's compilation
+metrics (torch._dynamo.utils.compilation_time_metrics), instead of one summed
+total_time.
+
+Every phase is read from one representative, outermost function, so nested
+timings are never double counted:
+
+  total             _compile.compile_inner, one entry per compiled frame
+  backend_compile   OutputGraph.call_user_compiler, time spent in the backend
+  dynamo_tracing    total - backend_compile
+  aot_autograd      create_aot_dispatcher_function
+  inductor_compile  compile_fx_inner / fx_codegen_and_compile
+  inductor_codegen  GraphLowering.compile_to_module
+
+Under dynamo.explain the backend is the explain backend, so only the Dynamo
+phases appear. profile_compile runs a real torch.compile for the AOTAutograd
+and Inductor phases. Results are stored as additional_data["compile_phases"]:
+
+  {"source": "explain" | "torch.compile",
+   "phases": {phase: seconds},
+   "per_graph": [seconds per compiled frame]}
+"""
+
+from typing import Dict, List, Optional
+
+COMPILE_PHASES_KEY = "compile_phases"
+
+PHASE_FUNCTIONS = {
+    "total": ["_compile.compile_inner", "compile_inner"],
+    "backend_compile": ["OutputGraph.call_user_compiler", "call_user_compiler"],
+    "aot_autograd": ["create_aot_dispatcher_function"],
+    "inductor_compile": ["compile_fx_inner", "fx_codegen_and_compile"],
+    "inductor_codegen": ["GraphLowering.compile_to_module", "compile_to_module"],
+}
+
+
+def _find(details: Dict[str, List[float]], names: List[str]) -> Optional[List[float]]:
+    for name in names:
+        for key, values in details.items():
+            if key == name or key.endswith("." + name):
+                return values
+    return None
+
+
+def phases_from_details(details: Dict[str, List[float]], source: str = "explain") -> dict:
+    """Reduce function -> runtimes metrics to per-phase totals and per-graph cost."""
+    phases = {}
+    for phase, names in PHASE_FUNCTIONS.items():
+        values = _find(details, names)
+        if values:
+            phases[phase] = float(sum(values))
+    if "total" in phases:
+        phases["dynamo_tracing"] = max(0.0, phases["total"] - phases.get("backend_compile", 0.0))
+    per_graph = [float(v) for v in (_find(details, PHASE_FUNCTIONS["total"]) or [])]
+    return {"source": source, "phases": phases, "per_graph": per_graph}
+
+
+def clear_metrics():
+    from torch._dynamo import utils
+
+    utils.compilation_time_metrics.clear()
+
+
+def collect_metrics(source: str = "explain") -> dict:
+    """Per-phase timings of everything compiled since the last clear_metrics()."""
+    from torch._dynamo import utils
+
+    details = {name: list(values) for name, values in utils.compilation_time_metrics.items()}
+    return phases_from_details(details, source)
+
+
+def profile_compile(model, inputs: dict) -> dict:
+    """Compile the model with torch.compile (Inductor) and return its per-phase timings."""
+    import torch
+    import torch._dynamo as dynamo
+
+    dynamo.reset()
+    clear_metrics()
+    with torch.no_grad():
+        torch.compile(model)(**inputs)
+    return collect_metrics("torch.compile")
@@ -1,100 +1,472 @@
+"""
+dynamo_explain_creator.py
+
+Runs torch._dynamo.explain for every model that has serialized inputs under
+inputs/<family>/*.pkl and appends the parsed output to the result store in
+dynamo_explain_output/results.sqlite (see result_store.py).
+
+Every model runs in its own spawned subprocess so that a model that hangs or
+runs out of memory only loses its own result. Up to --workers models run at
+once; torch intra-op threads are split evenly across the workers and each
+worker slot is pinned to its own set of CPUs.
+
+Usage:
+  python dynamo_explain_creator.py [--workers W] [--threads-per-worker T]
+                                   [--timeout SECONDS] [--memory-limit MB]
+                                   [--incremental] [--shard I/N] [--measure-runtime]
+                                   [--profile-compile] [--screen]
+                                   [--store PATH] [--state PATH]
+  python dynamo_explain_creator.py --merge-shards
+
+With --shard I/N (0 <= I < N) only the I-th of N shards of the models is run.
+Models are assigned to shards deterministically, balancing the compile times
+recorded in the result store, so N agents can split one nightly run. Each shard
+writes dynamo_explain_output/shard-I.sqlite, plus only the entries it changed
+in last_model_commits.json and model_class_index.json to
+last_model_commits.shard-I.json and model_class_index.shard-I.json;
+--merge-shards folds those back into the main store, state and class index.
+
+With --measure-runtime, eager and torch.compile inference are also timed on
+the same inputs (latency percentiles, throughput, peak memory; see
+runtime_profile.py) and stored with the result.
+
+Per-phase compile timings (Dynamo tracing, backend compile and, per compiled
+frame, the total; see compile_phases.py) are recorded for every explain run.
+With --profile-compile they are taken from a real torch.compile run instead,
+which adds the AOTAutograd and Inductor phases.
+
+With --screen, every model is first traced once on reduced inputs with a
+no-op backend (see graph_break_screen.py). Models that screen clean, i.e. show
+no graph break, are done after a few seconds and stored as a zero-break result
+without graphs or compile times; only models that fail screening
+go on to the full explain, runtime measurement and compile profiling. Combined
+with --incremental, only models whose commit or inputs changed are screened.
+
+With --incremental, each result is keyed on (model_id, HF commit sha, torch
+version, input signature) and recorded in last_model_commits.json. Models whose
+key is unchanged since the last successful run are skipped and their previous
+result is kept.
+
+--store and --state redirect results and incremental state away from the
+main store and last_model_commits.json; torch_matrix.py uses them to run the
+same models under several torch versions side by side.
+"""
+
 import os
+import sys
+import time
+import glob
+import json
 import pickle
-import torch
-from transformers import AutoModel
-from dynamo_explain_parser import DynamoExplainParser, DynamoExplainData
-
-import torch._dynamo as dynamo
+import hashlib
+import argparse
+import multiprocessing as mp
+from importlib import metadata
+from typing import Dict, List, Optional, Tuple
 
 INPUTS_DIR = "inputs"
-OUTPUT_DIR = "dynamo_explain_output"
-
-os.makedirs(OUTPUT_DIR, exist_ok=True)
-subdirs = os.listdir(INPUTS_DIR)
-
-for subdir in subdirs:
-        files = os.listdir(os.path.join(INPUTS_DIR, subdir))
-        for file in files:
-                if file.endswith(".pkl"):
-                        input_path = os.path.join(INPUTS_DIR, subdir, file)
-                        # Unpickle the inputs
-                        with open(input_path, "rb") as f:
-                                model_inputs = pickle.load(f)
-
-                        model_name = file.replace(".pkl", "").replace("--", "/")
-                        print("Model name:", model_name)
-                        if model_name == "HuggingFaceTB/SmolVLM2-256M-Video-Instruct":
-                                continue
-
-                        # Load the model
-                        try:
-                                        model = AutoModel.from_pretrained(model_name, trust_remote_code=True)
-                        except Exception:
-                                        from transformers import (
-                                                        AutoModelForCausalLM,
-                                                        AutoModelForSeq2SeqLM,
-                                                        AutoModelForMaskedLM,
-                                                        AutoModelForTokenClassification,
-                                                        AutoModelForSequenceClassification,
-                                                        AutoModelForQuestionAnswering,
-                                                        AutoModelForImageClassification,
-                                                        AutoModelForVision2Seq,
-                                                        AutoModelForSpeechSeq2Seq,
-                                                        AutoModelForAudioClassification,
-                                                        AutoModelForCTC,
-                                                        AutoModelForImageTextToText,
-                                                        RTDetrForObjectDetection,
-                                                        VitPoseForPoseEstimation,
-                                                        AutoProcessor,
-                                                        AutoImageProcessor,
-                                                        Dinov2Model
-
-                                        )
-                                        auto_model_classes = [
-                                                        AutoModelForCausalLM,
-                                                        AutoModelForSeq2SeqLM,
-                                                        AutoModelForMaskedLM,
-                                                        AutoModelForTokenClassification,
-                                                        AutoModelForSequenceClassification,
-                                                        AutoModelForQuestionAnswering,
-                                                        AutoModelForImageClassification,
-                                                        AutoModelForVision2Seq,
-                                                        AutoModelForSpeechSeq2Seq,
-                                                        AutoModelForAudioClassification,
-                                                        AutoModelForCTC,
-                                                        AutoModelForImageTextToText,
-                                                        RTDetrForObjectDetection,
-                                                        VitPoseForPoseEstimation,
-                                                        AutoProcessor,
-                                                        AutoImageProcessor,
-                                                        Dinov2Model
-                                        ]
-                                        model = None
-                                        for AutoModelClass in auto_model_classes:
-                                                        try:
-                                                                        model = AutoModelClass.from_pretrained(model_name, trust_remote_code=True)
-                                                                        break
-                                                        except Exception:
-                                                                        continue
-                                        if model is None:
-                                                        raise RuntimeError(f"Could not load any supported AutoModel for {model_name}")
-                        model.eval()
-
-                        # Run dynamo.explain
-                        try:
-                                explain_output = dynamo.explain(model)(**model_inputs)
-                        except Exception as e:
-                                print("Error occurred while explaining model:", e)
-                                continue
-
-                        print("Number of break reasons:", len(explain_output.break_reasons))
-                        if len(explain_output.break_reasons) == 0:
-                                continue
-
-                        data = DynamoExplainParser.parse_explain_output(explain_output)
-
-                        # Save the explain output
-                        output_file = os.path.splitext(file)[0] + "_dynamo_explain.pkl"
-                        output_path = os.path.join(OUTPUT_DIR, subdir, output_file)
-                        with open(output_path, "wb") as f:
-                                pickle.dump(data, f)
+
+SKIPPED_MODELS = {"HuggingFaceTB/SmolVLM2-256M-Video-Instruct"}
+
+SHARD_STORE_PATTERN = os.path.join("dynamo_explain_output", "shard-{}.sqlite")
+SHARD_STATE_PATTERN = "last_model_commits.shard-{}.json"
+SHARD_CLASS_INDEX_PATTERN = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                         "model_class_index.shard-{}.json")
+
+
+def find_jobs(inputs_dir: str = INPUTS_DIR) -> List[Tuple[str, str, str]]:
+    """Return (model_family, model_name, input_path) for every serialized input."""
+    jobs = []
+    for subdir in sorted(os.listdir(inputs_dir)):
+        family_dir = os.path.join(inputs_dir, subdir)
+        if not os.path.isdir(family_dir):
+            continue
+        for file in sorted(os.listdir(family_dir)):
+            if not file.endswith(".pkl"):
+                continue
+            model_name = file.replace(".pkl", "").replace("--", "/")
+            if model_name in SKIPPED_MODELS:
+                continue
+            jobs.append((subdir, model_name, os.path.join(family_dir, file)))
+    return jobs
+
+
+def parse_shard(value: str) -> Tuple[int, int]:
+    index, count = (int(part) for part in value.split("/"))
+    if not 0 <= index < count:
+        raise argparse.ArgumentTypeError(f"shard index must be in [0, {count}), got {index}")
+    return index, count
+
+
+def assign_shards(jobs, shard_count: int, compile_times: Dict[str, float]) -> List[list]:
+    """
+    Deterministically split jobs into shard_count shards of similar total compile time.
+
+    Longest-processing-time-first: jobs are taken in order of decreasing historical
+    compile time (ties broken by model name) and each goes to the currently lightest
+    shard. Models without history weigh as much as the median known model.
+    """
+    known = sorted(compile_times.values())
+    default_weight = known[len(known) // 2] if known else 1.0
+    weighted = sorted(jobs, key=lambda job: (-compile_times.get(job[1], default_weight), job[1]))
+    shards = [[] for _ in range(shard_count)]
+    loads = [0.0] * shard_count
+    for job in weighted:
+        lightest = min(range(shard_count), key=lambda i: (loads[i], i))
+        shards[lightest].append(job)
+        loads[lightest] += compile_times.get(job[1], default_weight)
+    return shards
+
+
+def merge_shards():
+    """Fold every per-shard store, state file and class index into the main ones."""
+    from model_loader import load_class_index, save_class_index_entry
+    from pull_hf_models import load_state, save_state
+    from result_store import ResultStore
+
+    with ResultStore() as store:
+        for shard_store in sorted(glob.glob(SHARD_STORE_PATTERN.format("*"))):
+            merged = store.merge_from(shard_store)
+            print(f"[+] Merged {merged} result(s) from {shard_store}")
+            os.remove(shard_store)
+
+    # Shard files only hold the entries their shard changed, and every model
+    # belongs to one shard, so no shard can revert another's update
+    state = load_state()
+    for shard_state in sorted(glob.glob(SHARD_STATE_PATTERN.format("*"))):
+        state.update(load_state(shard_state))
+        os.remove(shard_state)
+    save_state(state)
+
+    for shard_index in sorted(glob.glob(SHARD_CLASS_INDEX_PATTERN.format("*"))):
+        for model_id, class_name in load_class_index(shard_index).items():
+            save_class_index_entry(model_id, class_name)
+        os.remove(shard_index)
+
+
+def input_signature(input_path: str) -> str:
+    """Digest of the serialized inputs, so edited inputs invalidate cached results."""
+    digest = hashlib.sha256()
+    with open(input_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def result_key(model_name: str, commit: str, torch_version: str, signature: str) -> str:
+    payload = json.dumps([model_name, commit, torch_version, signature])
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def plan_incremental(jobs, state: Dict[str, dict]):
+    """
+    Split jobs into those that need to run and those whose cached result is current.
+
+    Returns (to_run, records) where records maps model_name -> the state record
+    to save once that model has been explained successfully.
+    """
+    from pull_hf_models import default_client, get_latest_commit
+
+    client = default_client()
+    torch_version = metadata.version("torch")
+    to_run, records = [], {}
+    for model_family, model_name, input_path in jobs:
+        try:
+            commit = get_latest_commit(model_name, client)
+        except Exception as e:
+            print(f"[!] Could not fetch latest commit for {model_name}: {e}")
+            commit = ""
+        signature = input_signature(input_path)
+        record = {
+            "commit": commit,
+            "torch_version": torch_version,
+            "input_signature": signature,
+            "key": result_key(model_name, commit, torch_version, signature),
+        }
+        previous = state.get(model_name)
+        if commit and isinstance(previous, dict) and previous.get("key") == record["key"]:
+            print(f"[*] {model_name} unchanged at {commit[:7]}; reusing cached result")
+            continue
+        records[model_name] = record
+        to_run.append((model_family, model_name, input_path, commit or None))
+    return to_run, records
+
+
+def make_state_updater(state: Dict[str, dict], records: Dict[str, dict], state_path: str,
+                       shard_only: bool = False):
+    """on_done callback for run_jobs that saves the state record of every model explained successfully.
+
+    With shard_only the state file only holds the models of this run, which
+    merge_shards folds into the main one.
+    """
+    from pull_hf_models import save_state
+
+    updated = {}
+
+    def on_done(job, status):
+        if status == "ok":
+            state[job[1]] = updated[job[1]] = records[job[1]]
+            save_state(updated if shard_only else state, state_path)
+
+    return on_done
+
+
+def explain_model(model_family: str, model_name: str, input_path: str,
+                  model_commit: Optional[str] = None, store_path: Optional[str] = None,
+                  measure_runtime: bool = False, profile_compile: bool = False,
+                  screen: bool = False) -> bool:
+    """Load one model, run dynamo.explain on its inputs and save the parsed output."""
+    import torch
+    import torch._dynamo as dynamo
+    from dynamo_explain_parser import DynamoExplainParser
+    from compile_phases import COMPILE_PHASES_KEY, clear_metrics, collect_metrics
+    from model_loader import load_model
+    from result_store import DEFAULT_STORE_PATH, ResultStore
+
+    # Unpickle the inputs
+    with open(input_path, "rb") as f:
+        model_inputs = pickle.load(f)
+
+    print("Model name:", model_name)
+    model = load_model(model_name)
+    model.eval()
+
+    def save(data):
+        with ResultStore(store_path or DEFAULT_STORE_PATH) as store:
+            store.append(model_family, model_name, data,
+                         model_commit=model_commit, torch_version=torch.__version__,
+                         build=os.getenv("BUILD_NUMBER"))
+
+    screening = None
+    if screen:
+        from dataclasses import asdict
+        from dynamo_explain_data import DynamoExplainData
+        from graph_break_screen import SCREEN_KEY, screen_model
+        screening = screen_model(model, model_inputs)
+        if screening.clean:
+            print(f"Screened clean in {screening.seconds:.1f}s ({screening.graph_count} graph(s)), skipping explain")
+            # Keep a zero-break row, so the history shows when a model stopped breaking
+            save(DynamoExplainData(graph_count=screening.graph_count, graph_break_count=0,
+                                   op_count=screening.op_count, break_reasons=[],
+                                   additional_data={SCREEN_KEY: asdict(screening),
+                                                    **({"model_commit": model_commit} if model_commit else {})}))
+            return True
+        print(f"Screening found {screening.graph_break_count} break(s) in {screening.seconds:.1f}s"
+              + (f", error: {screening.error}" if screening.error else ""))
+
+    # Run dynamo.explain
+    clear_metrics()
+    try:
+        explain_output = dynamo.explain(model)(**model_inputs)
+    except Exception as e:
+        print("Error occurred while explaining model:", e)
+        return False
+    phases = collect_metrics("explain")
+
+    print("Number of break reasons:", len(explain_output.break_reasons))
+
+    data = DynamoExplainParser.parse_explain_output(explain_output)
+    for warning in data.additional_data.get("compile_time_warnings", []):
+        print("compile_times:", warning)
+    if model_commit:
+        DynamoExplainParser.add_custom_data(data, "model_commit", model_commit)
+    if measure_runtime:
+        from runtime_profile import RUNTIME_KEY, measure_runtime as profile_runtime
+        try:
+            runtime = profile_runtime(model, model_inputs)
+            DynamoExplainParser.add_custom_data(data, RUNTIME_KEY, runtime)
+            print("Compile speedup:", runtime["speedup"])
+        except Exception as e:
+            print("Error occurred while measuring runtime:", e)
+    if profile_compile:
+        from compile_phases import profile_compile as profile_phases
+        try:
+            phases = profile_phases(model, model_inputs)
+        except Exception as e:
+            print("Error occurred while profiling torch.compile:", e)
+    DynamoExplainParser.add_custom_data(data, COMPILE_PHASES_KEY, phases)
+    if screening is not None:
+        DynamoExplainParser.add_custom_data(data, SCREEN_KEY, asdict(screening))
+
+    # Save the explain output, also when it has no breaks
+    save(data)
+    return True
+
+
+def _worker_main(job, cpus: Optional[List[int]], threads: int, memory_limit_mb: Optional[int],
+                 store_path: Optional[str], measure_runtime: bool, profile_compile: bool,
+                 screen: bool):
+    """Entry point of a per-model subprocess: apply resource limits, then explain."""
+    if cpus and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cpus)
+    if memory_limit_mb:
+        import resource
+        limit = memory_limit_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+    import torch
+    torch.set_num_threads(threads)
+
+    try:
+        ok = explain_model(*job, store_path=store_path, measure_runtime=measure_runtime,
+                           profile_compile=profile_compile, screen=screen)
+    except MemoryError:
+        print(f"[!] {job[1]} exceeded the memory limit of {memory_limit_mb} MB")
+        ok = False
+    except Exception as e:
+        print(f"[!] Failed to explain {job[1]}: {e}")
+        ok = False
+    sys.stdout.flush()
+    sys.exit(0 if ok else 1)
+
+
+def _cpu_slots(workers: int) -> List[Optional[List[int]]]:
+    """Split the CPUs available to this process into one contiguous set per worker."""
+    if not hasattr(os, "sched_getaffinity"):
+        return [None] * workers
+    cpus = sorted(os.sched_getaffinity(0))
+    if len(cpus) < workers:
+        return [[cpus[i % len(cpus)]] for i in range(workers)]
+    per_worker = max(1, len(cpus) // workers)
+    return [cpus[i * per_worker:(i + 1) * per_worker] for i in range(workers)]
+
+
+def run_jobs(jobs, workers: int = 1, threads_per_worker: Optional[int] = None,
+             timeout: Optional[float] = None, memory_limit_mb: Optional[int] = None,
+             on_done=None, store_path: Optional[str] = None,
+             measure_runtime: bool = False, profile_compile: bool = False,
+             screen: bool = False) -> dict:
+    """
+    Run every job in its own subprocess, at most `workers` at a time.
+
+    Returns a dict of model_name -> status ("ok", "failed" or "timeout").
+    `on_done(job, status)` is called in the parent as each model finishes.
+    """
+    ctx = mp.get_context("spawn")
+    slots = _cpu_slots(workers)
+    if threads_per_worker is None:
+        threads_per_worker = len(slots[0]) if slots[0] else max(1, (os.cpu_count() or 1) // workers)
+
+    pending = list(jobs)
+    running = {}  # slot -> (process, job, start_time)
+    results = {}
+
+    def finish(slot, status):
+        proc, job, start = running.pop(slot)
+        results[job[1]] = status
+        print(f"[+] {job[1]}: {status} in {time.time() - start:.1f}s")
+        if on_done is not None:
+            on_done(job, status)
+
+    while pending or running:
+        free_slots = [s for s in range(workers) if s not in running]
+        while pending and free_slots:
+            slot = free_slots.pop(0)
+            job = pending.pop(0)
+            proc = ctx.Process(
+                target=_worker_main,
+                args=(job, slots[slot], threads_per_worker, memory_limit_mb, store_path,
+                      measure_runtime, profile_compile, screen),
+                name=f"explain-{job[1]}",
+            )
+            proc.start()
+            running[slot] = (proc, job, time.time())
+
+        time.sleep(0.2)
+        for slot, (proc, job, start) in list(running.items()):
+            if not proc.is_alive():
+                proc.join()
+                finish(slot, "ok" if proc.exitcode == 0 else "failed")
+            elif timeout is not None and time.time() - start > timeout:
+                proc.kill()
+                proc.join()
+                finish(slot, "timeout")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run torch._dynamo.explain over all serialized model inputs.")
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Number of models to explain in parallel')
+    parser.add_argument('--threads-per-worker', type=int, default=None,
+                        help='torch intra-op threads per worker (default: CPUs / workers)')
+    parser.add_argument('--timeout', type=float, default=None,
+                        help='Per-model timeout in seconds')
+    parser.add_argument('--memory-limit', type=int, default=None,
+                        help='Per-model address space limit in MB')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Skip models whose commit, torch version and inputs are unchanged')
+    parser.add_argument('--measure-runtime', action='store_true',
+                        help='Also time eager vs torch.compile inference on the same inputs')
+    parser.add_argument('--profile-compile', action='store_true',
+                        help='Take per-phase compile timings from a torch.compile (Inductor) run')
+    parser.add_argument('--screen', action='store_true',
+                        help='Skip the full explain for models that show no graph break in a quick tracing pass')
+    parser.add_argument('--shard', type=parse_shard, default=None, metavar='I/N',
+                        help='Only run shard I of N (0-based)')
+    parser.add_argument('--merge-shards', action='store_true',
+                        help='Merge per-shard stores and state files into the main ones and exit')
+    parser.add_argument('--store', default=None,
+                        help='Append results to this store instead of the main one')
+    parser.add_argument('--state', default=None,
+                        help='Incremental state file to use instead of last_model_commits.json')
+    args = parser.parse_args()
+
+    if args.merge_shards:
+        merge_shards()
+        return
+
+    jobs = find_jobs()
+    store_path = args.store
+    state_path = args.state
+    class_index_before = None
+    if args.shard is not None:
+        from model_loader import load_class_index
+        from result_store import DEFAULT_STORE_PATH, ResultStore
+
+        class_index_before = load_class_index()
+
+        index, count = args.shard
+        with ResultStore(args.store or DEFAULT_STORE_PATH) as history:
+            compile_times = history.latest_compile_times()
+        jobs = assign_shards(jobs, count, compile_times)[index]
+        store_path = SHARD_STORE_PATTERN.format(index)
+        state_path = SHARD_STATE_PATTERN.format(index)
+        print(f"[+] Shard {index}/{count}: {len(jobs)} models")
+
+    on_done = None
+    if args.incremental:
+        from pull_hf_models import STATE_FILE, load_state
+
+        state = load_state(args.state or STATE_FILE)
+        state_path = state_path or STATE_FILE
+        total = len(jobs)
+        jobs, records = plan_incremental(jobs, state)
+        print(f"[+] {total - len(jobs)} of {total} models unchanged since last run")
+        on_done = make_state_updater(state, records, state_path, shard_only=args.shard is not None)
+
+    print(f"[+] {len(jobs)} models to explain with {args.workers} worker(s)")
+    results = run_jobs(jobs, workers=max(1, args.workers),
+                       threads_per_worker=args.threads_per_worker,
+                       timeout=args.timeout, memory_limit_mb=args.memory_limit,
+                       on_done=on_done, store_path=store_path,
+                       measure_runtime=args.measure_runtime,
+                       profile_compile=args.profile_compile, screen=args.screen)
+    failed = [name for name, status in results.items() if status != "ok"]
+    if failed:
+        print(f"[!] {len(failed)} model(s) did not complete: {', '.join(failed)}")
+
+    # Only now that no worker is loading weights
+    from model_loader import WarmWeightCache
+    WarmWeightCache().evict()
+
+    if class_index_before is not None:
+        # Hand the Auto classes this shard resolved to merge_shards
+        changed = {model_id: class_name for model_id, class_name in load_class_index().items()
+                   if class_index_before.get(model_id) != class_name}
+        with open(SHARD_CLASS_INDEX_PATTERN.format(args.shard[0]), "w") as f:
+            json.dump(changed, f, indent=2, sort_keys=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,40 @@
+"""
+dynamo_explain_data.py
+
+Data model of a parsed dynamo explain result. Kept free of torch and the
+parser so that anything that only reads results (the result store, the
+collector, the viewer) starts without importing torch.
+
+The classes are also re-exported by dynamo_explain_parser, which is where
+older pickled results look them up.
+"""
+
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence
+
+@dataclass
+class BreakReason:
+    number: int
+    reason: str
+    user_stack: List[str]
+
+@dataclass
+class CompileTime:
+    total_time: float
+    details: Dict[str, List[float]]
+
+@dataclass
+class DynamoExplainData:
+    graph_count: int
+    graph_break_count: int
+    op_count: int
+    break_reasons: List[BreakReason]
+    compile_times: Optional[CompileTime] = None
+    # Extensible field for additional data
+    additional_data: Dict[str, Any] = None
+    # Rendered lazily, see DynamoExplainParser.parse_explain_output
+    graphs: Sequence[str] = None
+
+    def __post_init__(self):
+        if self.additional_data is None:
+            self.additional_data = {}
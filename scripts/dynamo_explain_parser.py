@@ -1,42 +1,97 @@
-from dataclasses import dataclass
-from typing import List, Optional, Dict, Any
-from torch._dynamo.backends.debugging import ExplainOutput
+from typing import TYPE_CHECKING, List, Dict, Any, Tuple
+from dynamo_explain_data import BreakReason, CompileTime, DynamoExplainData
+from lazy_payload import LazySequence
 import html
+import io
+import re
 
-@dataclass
-class BreakReason:
-    number: int
-    reason: str
-    user_stack: List[str]
-
-@dataclass
-class CompileTime:
-    total_time: float
-    details: Dict[str, List[float]]
-
-@dataclass
-class DynamoExplainData:
-    graph_count: int
-    graph_break_count: int
-    op_count: int
-    break_reasons: List[BreakReason]
-    compile_times: Optional[CompileTime] = None
-    # Extensible field for additional data
-    additional_data: Dict[str, Any] = None
-    graphs: List[str] = None
-
-    def __post_init__(self):
-        if self.additional_data is None:
-            self.additional_data = {}
+if TYPE_CHECKING:
+    # Only for annotations; importing torch here would make every reader of results pay for it
+    from torch._dynamo.backends.debugging import ExplainOutput
+
+
+# Title, header and ruler lines of the compile_times table, in every torch version's format
+_COMPILE_TIMES_SKIP = re.compile(
+    r"^\|?\s*(torchdynamo compilation metrics:?|function[\s,|]+runtimes\b.*|[\s\-=+|:]*)$", re.IGNORECASE
+)
+# Function name, then its runtimes separated by commas, whitespace or a table column bar
+_COMPILE_TIMES_ROW = re.compile(r"^\|?\s*(?P<name>[^\s,|]+)\s*[,|]?(?P<values>.*?)\|?\s*$")
+_COMPILE_TIMES_TOKEN = re.compile(
+    r"(?P<num>[-+]?(?:\d+(?:\.\d*)?|\.\d+)(?:[eE][-+]?\d+)?)\s*(?P<unit>ms|us|µs|ns|s)?(?![^,\s])"
+    r"|(?P<other>[^,\s]+)"
+)
+_UNIT_SECONDS = {None: 1.0, "s": 1.0, "ms": 1e-3, "us": 1e-6, "µs": 1e-6, "ns": 1e-9}
+_MISSING_VALUES = {"-", "--", "n/a", "na", "nan", "none", "null"}
+MAX_COMPILE_TIME_WARNINGS = 20
 
 class DynamoExplainParser:
     @staticmethod
-    def parse_explain_output(explain_output: ExplainOutput) -> DynamoExplainData:
-        """Parse the ExplainOutput object from torch._dynamo.explain()"""
+    def parse_compile_times(compile_times_str: str) -> Tuple[CompileTime, List[str]]:
+        """Parse the compile_times table of an ExplainOutput in a single pass.
+
+        Handles the tabulate layout (title, header, ruler, whitespace-separated
+        columns) as well as the comma-separated fallback torch uses without
+        tabulate, cells with several runtimes, values with units (s, ms, us, ns;
+        normalized to seconds) and missing values (-, None, nan, empty).
+
+        Malformed tokens, and rows without any runtime or missing-value cell,
+        are skipped and reported in the returned warnings instead of failing
+        the whole result.
+        """
+        details: Dict[str, List[float]] = {}
+        warnings: List[str] = []
+        total_time = 0.0
+
+        def warn(message):
+            if len(warnings) < MAX_COMPILE_TIME_WARNINGS:
+                warnings.append(message)
+            elif len(warnings) == MAX_COMPILE_TIME_WARNINGS:
+                warnings.append("further compile_times warnings suppressed")
+
+        if not isinstance(compile_times_str, str):
+            warn(f"compile_times is a {type(compile_times_str).__name__}, not a table")
+            return CompileTime(total_time, details), warnings
+
+        for line_no, line in enumerate(io.StringIO(compile_times_str), 1):
+            line = line.strip()
+            if _COMPILE_TIMES_SKIP.match(line):
+                continue
+            row = _COMPILE_TIMES_ROW.match(line)
+            runtimes, skipped, cells = [], [], 0
+            for token in _COMPILE_TIMES_TOKEN.finditer(row.group("values") if row else ""):
+                if token.group("num") is not None:
+                    runtimes.append(float(token.group("num")) * _UNIT_SECONDS[token.group("unit")])
+                    cells += 1
+                elif token.group("other").lower() in _MISSING_VALUES:
+                    cells += 1
+                else:
+                    skipped.append(token.group("other"))
+            # A row needs at least one runtime or missing-value cell to be a function's row
+            if not cells:
+                warn(f"line {line_no}: unrecognized row {line!r}")
+                continue
+            details.setdefault(row.group("name"), []).extend(runtimes)
+            total_time += sum(runtimes)
+            for value in skipped:
+                warn(f"line {line_no}: skipped value {value!r} of {row.group('name')}")
+
+        return CompileTime(total_time, details), warnings
+
+    @staticmethod
+    def parse_explain_output(explain_output: "ExplainOutput") -> DynamoExplainData:
+        """Parse the ExplainOutput object from torch._dynamo.explain()
+
+        Graph text and ops per graph are not rendered up front but each time an
+        item is accessed, so the result store renders and writes one graph at a
+        time.
+        """
+
+        fx_graphs = list(explain_output.graphs)
 
-        graphs = []
-        for graph in explain_output.graphs:
-            graphs.append(graph.print_readable())
+        def render_graph(i):
+            return fx_graphs[i].print_readable(print_output=False)
+
+        graphs = LazySequence(len(fx_graphs), render_graph)
         
         graph_count = explain_output.graph_count
         graph_break_count = explain_output.graph_break_count
@@ -49,23 +104,11 @@ class DynamoExplainParser:
             break_reasons.append(BreakReason(idx+1, reason, user_stack))
         
         compile_times = None
+        compile_time_warnings = []
         if explain_output.compile_times is not None:
-            compile_time_str = explain_output.compile_times
-            total_time = 0.0
-            details = {}
-            
-            # Split into lines and parse each function's runtimes
-            lines = compile_time_str.split('\n')
-            if len(lines) >= 3:  # Skip header lines
-                for line in lines[2:]:
-                    parts = line.split(',')
-                    if len(parts) > 1:
-                        func_name = parts[0].strip()
-                        runtimes = [float(t.strip()) for t in parts[1:]]
-                        details[func_name] = runtimes
-                        total_time += sum(runtimes)
-            
-            compile_times = CompileTime(total_time, details)
+            compile_times, compile_time_warnings = DynamoExplainParser.parse_compile_times(
+                explain_output.compile_times
+            )
         
         # Create the data object
         data = DynamoExplainData(
@@ -79,11 +122,16 @@ class DynamoExplainParser:
         
         # Add ops_per_graph if available
         if explain_output.ops_per_graph is not None:
-            ops_per_graph = []
-            for ops in explain_output.ops_per_graph:
-                ops_per_graph.append([html.escape(str(op)) for op in ops])
-            data.additional_data['ops_per_graph'] = ops_per_graph
+            raw_ops_per_graph = list(explain_output.ops_per_graph)
+
+            def render_ops(i):
+                return [html.escape(str(op)) for op in raw_ops_per_graph[i]]
+
+            data.additional_data['ops_per_graph'] = LazySequence(len(raw_ops_per_graph), render_ops)
         
+        if compile_time_warnings:
+            data.additional_data['compile_time_warnings'] = compile_time_warnings
+
         # Add out_guards if available
         if explain_output.out_guards is not None:
             out_guards = [html.escape(str(guard)) for guard in explain_output.out_guards]
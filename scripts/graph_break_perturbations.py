@@ -0,0 +1,134 @@
+"""
+graph_break_perturbations.py
+
+Pluggable input perturbations for the graph-break injection harness.
+
+Each perturbation is a cheap, deterministic transform of input_ids that is
+applied inside a patched forward and reliably produces one category of graph
+break (see break_reason_taxonomy.py). They replace the UMAP fit the harness
+used to run on every call: the "embedding" perturbation now projects the ids
+with a fixed random matrix that is built once per sequence length and cached,
+so a call costs microseconds and no numba or pynndescent import.
+
+Every transform takes (input_ids, vocab_size) and keeps ids in [0, vocab_size):
+shifts are small and wrap around the vocabulary, so the embedding lookup never
+fails and the run ends in the intended graph break instead of an IndexError.
+Outside of tracing, the patched forward checks this after every perturbation.
+
+Register a new perturbation by adding it to PERTURBATIONS.
+
+Usage:
+  from graph_break_perturbations import apply_perturbations
+  apply_perturbations(model)                          # DEFAULT_PERTURBATIONS
+  apply_perturbations(model, ["item_shift", "data_dependent_branch"])
+"""
+
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Callable, Dict, Iterable, Optional
+
+EMBEDDING_SEED = 42
+EMBEDDING_DIM = 2
+# Largest shift the embedding perturbation adds to a token id
+MAX_EMBEDDING_SHIFT = 16
+
+
+@dataclass(frozen=True)
+class Perturbation:
+    name: str
+    apply: Callable
+    # Break category it is expected to produce, as named by break_reason_taxonomy.RULES
+    category: Optional[str] = None
+
+
+@lru_cache(maxsize=None)
+def _projection(width: int):
+    import numpy as np
+
+    rng = np.random.default_rng(EMBEDDING_SEED)
+    return rng.standard_normal((width, EMBEDDING_DIM)) / np.sqrt(width)
+
+
+def _shift_first(input_ids, delta: int, vocab_size: Optional[int]):
+    shifted = input_ids.clone()
+    shifted[0, 0] += delta
+    if vocab_size:
+        shifted[0, 0] %= vocab_size
+    return shifted
+
+
+def seq_len_shift(input_ids, vocab_size: Optional[int] = None):
+    """Add the sequence length to the first token, as the original harness did."""
+    return _shift_first(input_ids, input_ids.shape[1], vocab_size)
+
+
+def embedding_shift(input_ids, vocab_size: Optional[int] = None):
+    """Shift the first token by a cached numpy embedding coordinate, read back as a Python scalar."""
+    embedding = input_ids.cpu().numpy() @ _projection(input_ids.shape[1])
+    # The raw coordinate scales with the token ids, so only its low part is used
+    return _shift_first(input_ids, int(embedding[0, 0]) % MAX_EMBEDDING_SHIFT, vocab_size)
+
+
+def numpy_roundtrip(input_ids, vocab_size: Optional[int] = None):
+    import numpy as np
+    import torch
+
+    return torch.from_numpy(np.ascontiguousarray(input_ids.cpu().numpy())).to(input_ids.device)
+
+
+def item_shift(input_ids, vocab_size: Optional[int] = None):
+    return _shift_first(input_ids, input_ids[0, -1].item() % 2, vocab_size)
+
+
+def data_dependent_branch(input_ids, vocab_size: Optional[int] = None):
+    if input_ids.sum() % 2 == 0:
+        return input_ids.flip(-1)
+    return input_ids
+
+
+PERTURBATIONS: Dict[str, Perturbation] = {p.name: p for p in [
+    Perturbation("seq_len_shift", seq_len_shift),
+    Perturbation("embedding", embedding_shift, "numpy interop"),
+    Perturbation("numpy_roundtrip", numpy_roundtrip, "numpy interop"),
+    Perturbation("item_shift", item_shift, "data-dependent operator"),
+    Perturbation("data_dependent_branch", data_dependent_branch, "data-dependent control flow"),
+]}
+
+# What build_model_inputs used to inject: seq-length shift plus an embedding value
+DEFAULT_PERTURBATIONS = ("seq_len_shift", "embedding")
+
+
+def check_ids(input_ids, vocab_size: Optional[int], name: str = "input"):
+    """Raise ValueError if any token id falls outside [0, vocab_size)."""
+    low, high = int(input_ids.min()), int(input_ids.max())
+    if low < 0 or (vocab_size and high >= vocab_size):
+        raise ValueError(f"{name} produced token ids in [{low}, {high}], outside [0, {vocab_size})")
+
+
+def perturb(input_ids, names: Iterable[str] = DEFAULT_PERTURBATIONS, vocab_size: Optional[int] = None):
+    import torch
+
+    for name in names:
+        input_ids = PERTURBATIONS[name].apply(input_ids, vocab_size)
+        # The check reads tensor values, which would add graph breaks of its own while tracing
+        if not torch.compiler.is_compiling():
+            check_ids(input_ids, vocab_size, f"Perturbation {name}")
+    return input_ids
+
+
+def apply_perturbations(model, names: Iterable[str] = DEFAULT_PERTURBATIONS):
+    """Patch model.forward to perturb input_ids before every call; the original stays in model.original_forward."""
+    names = tuple(names)
+    unknown = [name for name in names if name not in PERTURBATIONS]
+    if unknown:
+        raise KeyError(f"Unknown perturbation(s): {', '.join(unknown)}")
+
+    model.original_forward = model.forward
+    vocab_size = getattr(getattr(model, "config", None), "vocab_size", None)
+
+    def forward_refined(**kwargs):
+        kwargs["input_ids"] = perturb(kwargs["input_ids"], names, vocab_size)
+        return model.original_forward(**kwargs)
+
+    model.forward = forward_refined
+    return model
@@ -0,0 +1,82 @@
+"""
+graph_break_screen.py
+
+Cheap pre-flight screening for graph breaks, run before the full explain.
+
+The model is traced once by Dynamo with a counting backend that just returns
+the captured graph's forward, so nothing is compiled (no AOTAutograd, no
+Inductor). suppress_errors is on so an unsupported construct falls back to
+eager instead of raising. Token inputs are cut down to one sample of at most
+SCREEN_MAX_TOKENS tokens; other tensors only lose their batch dimension, since
+vision and audio models usually need their full feature shape.
+
+A model screens clean when at least one graph was captured and Dynamo
+recorded no graph breaks. Anything else (breaks, no graph at all, an error on
+the reduced inputs) means the model goes on to the full explain.
+"""
+
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+
+SCREEN_KEY = "screening"
+SCREEN_MAX_BATCH = 1
+SCREEN_MAX_TOKENS = 16
+
+
+@dataclass
+class ScreenResult:
+    graph_count: int = 0
+    graph_break_count: int = 0
+    # call_function nodes over all graphs, as counted by dynamo.explain
+    op_count: int = 0
+    seconds: float = 0.0
+    error: Optional[str] = None
+    break_reasons: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def clean(self) -> bool:
+        return self.error is None and self.graph_count > 0 and self.graph_break_count == 0
+
+
+def shrink_inputs(inputs, max_batch: int = SCREEN_MAX_BATCH, max_tokens: int = SCREEN_MAX_TOKENS) -> dict:
+    """Reduce the batch of every tensor input, and the sequence length of token inputs."""
+    import torch
+
+    shrunk = {}
+    for name, value in dict(inputs).items():
+        if isinstance(value, torch.Tensor) and value.dim() >= 1:
+            value = value[:max_batch]
+            # input_ids, attention_mask, token_type_ids, position_ids, ...
+            if value.dim() >= 2 and not value.is_floating_point():
+                value = value[:, :max_tokens]
+        shrunk[name] = value
+    return shrunk
+
+
+def screen_model(model, inputs) -> ScreenResult:
+    """Trace the model once with a no-op backend and count graphs and graph breaks."""
+    import torch
+    import torch._dynamo as dynamo
+    from torch._dynamo.utils import counters
+
+    result = ScreenResult()
+
+    def counting_backend(gm, example_inputs):
+        result.graph_count += 1
+        result.op_count += sum(1 for node in gm.graph.nodes if node.op == "call_function")
+        return gm.forward
+
+    dynamo.reset()
+    counters.clear()
+    start = time.perf_counter()
+    try:
+        with dynamo.config.patch(suppress_errors=True), torch.no_grad():
+            dynamo.optimize(counting_backend)(model)(**shrink_inputs(inputs))
+    except Exception as e:
+        result.error = str(e)
+    result.seconds = time.perf_counter() - start
+    result.break_reasons = dict(counters["graph_break"])
+    result.graph_break_count = sum(result.break_reasons.values())
+    dynamo.reset()
+    return result
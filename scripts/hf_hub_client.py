@@ -0,0 +1,139 @@
+"""
+hf_hub_client.py
+
+Small thread-safe client for the Hugging Face Hub HTTP API used by the pipeline
+scripts. All requests share one pooled `requests` session, are throttled by a
+request budget shared across threads, and are retried with exponential backoff
+on connection errors, 429 and 5xx responses.
+
+The endpoint defaults to https://huggingface.co and can be pointed at a local
+stand-in server through the HF_ENDPOINT environment variable.
+
+When given a HubMetadataCache, JSON metadata calls are served from the cache
+while fresh, revalidated with If-None-Match once stale, and served entirely
+from the cache in offline mode.
+"""
+
+import os
+import time
+import random
+import threading
+from typing import Any, Dict, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from hub_metadata_cache import HubMetadataCache, OfflineCacheMiss
+
+DEFAULT_ENDPOINT = "https://huggingface.co"
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class RateLimiter:
+    """Token bucket allowing `rate` requests per second with bursts of up to `burst`."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class HubClient:
+    # pool_size and burst cover the 18 Computer Vision tasks that fetch_top_models lists at once
+    def __init__(self, endpoint: Optional[str] = None, token: Optional[str] = None,
+                 pool_size: int = 20, rate: float = 10.0, burst: int = 20,
+                 max_retries: int = 5, backoff: float = 0.5, timeout: float = 30.0,
+                 cache: Optional[HubMetadataCache] = None):
+        self.cache = cache
+        self.endpoint = (endpoint or os.getenv("HF_ENDPOINT") or DEFAULT_ENDPOINT).rstrip("/")
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self.limiter = RateLimiter(rate, burst)
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        token = token or os.getenv("HF_TOKEN")
+        if token:
+            self.session.headers["Authorization"] = f"Bearer {token}"
+
+    def _sleep_before_retry(self, attempt: int, response: Optional[requests.Response]):
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after and retry_after.isdigit():
+            delay = float(retry_after)
+        else:
+            delay = self.backoff * (2 ** attempt) * (1 + random.random())
+        time.sleep(delay)
+
+    def get(self, path: str, params: Optional[Dict[str, Any]] = None,
+            headers: Optional[Dict[str, str]] = None) -> requests.Response:
+        """GET `path` under the endpoint, retrying transient failures."""
+        url = f"{self.endpoint}{path}"
+        for attempt in range(self.max_retries + 1):
+            self.limiter.acquire()
+            try:
+                response = self.session.get(url, params=params, headers=headers, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt == self.max_retries:
+                    raise
+                self._sleep_before_retry(attempt, None)
+                continue
+            if response.status_code in RETRY_STATUSES and attempt < self.max_retries:
+                self._sleep_before_retry(attempt, response)
+                continue
+            response.raise_for_status()
+            return response
+
+    def get_json(self, path: str, params: Optional[Dict[str, Any]] = None,
+                 endpoint: str = "") -> Any:
+        """GET a JSON document, going through the metadata cache if one is configured."""
+        if self.cache is None:
+            return self.get(path, params=params).json()
+
+        key = self.cache.make_key(f"{self.endpoint}{path}", params)
+        entry = self.cache.get(key)
+        if self.cache.offline:
+            if entry is None:
+                raise OfflineCacheMiss(f"{path} is not in the metadata cache")
+            return entry.body
+        if entry is not None and self.cache.is_fresh(endpoint, entry):
+            return entry.body
+
+        headers = {"If-None-Match": entry.etag} if entry is not None and entry.etag else None
+        response = self.get(path, params=params, headers=headers)
+        if response.status_code == 304:
+            self.cache.touch(key)
+            return entry.body
+        body = response.json()
+        self.cache.put(key, endpoint, body, response.headers.get("ETag"))
+        return body
+
+    def list_models(self, pipeline_tag: str, limit: int, sort: str = "trending_score",
+                    expand: Optional[List[str]] = None) -> List[dict]:
+        params = {"pipeline_tag": pipeline_tag, "limit": limit, "sort": sort, "direction": -1}
+        if expand:
+            params["expand"] = expand
+        return self.get_json("/api/models", params=params, endpoint="models")
+
+    def latest_commit(self, model_id: str, revision: str = "main") -> str:
+        commits = self.get_json(f"/api/models/{model_id}/commits/{revision}", endpoint="commits")
+        if not commits:
+            return ""
+        return commits[0]["id"]
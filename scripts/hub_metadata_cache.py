@@ -0,0 +1,103 @@
+"""
+hub_metadata_cache.py
+
+On-disk SQLite cache for Hugging Face Hub metadata responses (model listings,
+commit lists). Every entry remembers when it was fetched and the ETag the Hub
+returned, so stale entries can be revalidated with If-None-Match instead of
+being downloaded again. In offline mode entries are served regardless of age
+and a miss raises OfflineCacheMiss.
+
+The cache location defaults to ~/.cache/hub_metadata/hub_metadata.sqlite and can
+be overridden with HF_METADATA_CACHE; HF_METADATA_OFFLINE=1 enables offline mode.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+DEFAULT_CACHE_PATH = os.path.expanduser("~/.cache/hub_metadata/hub_metadata.sqlite")
+
+# Seconds an entry is served without revalidation, per endpoint
+DEFAULT_TTLS = {
+    "models": 6 * 3600,
+    "commits": 10 * 60,
+}
+FALLBACK_TTL = 3600
+
+
+class OfflineCacheMiss(RuntimeError):
+    pass
+
+
+@dataclass
+class CacheEntry:
+    body: Any
+    etag: Optional[str]
+    fetched_at: float
+
+
+class HubMetadataCache:
+    def __init__(self, path: Optional[str] = None, ttls: Optional[Dict[str, float]] = None,
+                 offline: Optional[bool] = None):
+        self.path = path or os.getenv("HF_METADATA_CACHE") or DEFAULT_CACHE_PATH
+        self.ttls = dict(DEFAULT_TTLS, **(ttls or {}))
+        if offline is None:
+            offline = os.getenv("HF_METADATA_OFFLINE", "") not in ("", "0")
+        self.offline = offline
+
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY,"
+            " endpoint TEXT NOT NULL,"
+            " etag TEXT,"
+            " fetched_at REAL NOT NULL,"
+            " body TEXT NOT NULL)"
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(path: str, params: Optional[Dict[str, Any]] = None) -> str:
+        return path + "?" + json.dumps(params or {}, sort_keys=True)
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT body, etag, fetched_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        return CacheEntry(json.loads(row[0]), row[1], row[2])
+
+    def is_fresh(self, endpoint: str, entry: CacheEntry) -> bool:
+        return time.time() - entry.fetched_at < self.ttls.get(endpoint, FALLBACK_TTL)
+
+    def put(self, key: str, endpoint: str, body: Any, etag: Optional[str]):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, endpoint, etag, fetched_at, body)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (key, endpoint, etag, time.time(), json.dumps(body)),
+            )
+            self._conn.commit()
+
+    def touch(self, key: str):
+        """Mark an entry as freshly validated (after a 304 Not Modified)."""
+        with self._lock:
+            self._conn.execute("UPDATE responses SET fetched_at = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+
+    def clear(self, endpoint: Optional[str] = None):
+        with self._lock:
+            if endpoint is None:
+                self._conn.execute("DELETE FROM responses")
+            else:
+                self._conn.execute("DELETE FROM responses WHERE endpoint = ?", (endpoint,))
+            self._conn.commit()
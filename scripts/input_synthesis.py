@@ -0,0 +1,328 @@
+"""
+input_synthesis.py
+
+Builds minimal valid model inputs from a model's config and forward signature,
+without downloading weights or datasets.
+
+Only config.json is fetched. The model class is resolved from
+config.architectures (or the resolved-class index of model_loader.py), and its
+forward signature decides which inputs are built. Each input name has a rule in
+INPUT_RULES that turns the config into a tensor spec (shape, dtype, fill); new
+input kinds are supported by adding a rule.
+
+Specs are materialized with a fixed seed and cached on disk in
+input_synthesis_cache/, keyed by the architecture plus a digest of the forward
+signature and the specs. The digest covers the config sizes the specs were
+built from (vocab size, image size, ...), so models that share an architecture
+and input shapes share one cache entry.
+
+Usage:
+  # Inputs for the top N models of a family (all families without --family)
+  python input_synthesis.py [--family "Computer Vision"] [--top 30]
+
+  # Inputs for specific models
+  python input_synthesis.py --family Audio facebook/mms-tts-rus openai/whisper-tiny
+
+Synthesized inputs are written to inputs/<family>/<org--model>.pkl, the layout
+dynamo_explain_creator.py reads. Existing files are kept unless --overwrite is
+given, so inputs hand-built with inputs_driver.py take precedence.
+"""
+
+import os
+import json
+import shutil
+import pickle
+import hashlib
+import inspect
+import argparse
+from typing import Callable, Dict, List, Optional, Tuple
+
+INPUTS_DIR = "inputs"
+CACHE_DIR = "input_synthesis_cache"
+
+BATCH_SIZE = 1
+SEQ_LEN = 8
+AUDIO_SAMPLES = 16000
+SEED = 0
+
+# (shape, dtype, fill); fill is "randn", "ones", "zeros", "arange", "randint:<high>" or "full:<value>"
+Spec = Tuple[Tuple[int, ...], str, str]
+
+# Inputs built when the forward accepts them, even if optional
+PRIMARY_INPUTS = ("input_ids", "pixel_values", "input_features", "input_values")
+
+
+class SynthesisError(Exception):
+    pass
+
+
+def _config_value(config, names, default=None):
+    """First set attribute among `names`, on the config or its text/vision/audio sub-configs."""
+    for cfg in (config, *(getattr(config, sub, None) for sub in
+                          ("text_config", "vision_config", "audio_config", "encoder", "decoder"))):
+        if cfg is None:
+            continue
+        for name in names:
+            value = getattr(cfg, name, None)
+            if value is not None:
+                return value
+    return default
+
+
+def _image_size(config) -> Tuple[int, int]:
+    size = _config_value(config, ("image_size", "img_size", "input_size"), 224)
+    if isinstance(size, dict):
+        size = (size.get("height") or size.get("shortest_edge") or 224,
+                size.get("width") or size.get("shortest_edge") or 224)
+    if isinstance(size, (list, tuple)):
+        return int(size[-2]), int(size[-1])
+    return int(size), int(size)
+
+
+def _input_ids(config) -> Spec:
+    vocab_size = int(_config_value(config, ("vocab_size",), 1000))
+    return (BATCH_SIZE, SEQ_LEN), "long", f"randint:{vocab_size}"
+
+
+def _decoder_input_ids(config) -> Spec:
+    start = _config_value(config, ("decoder_start_token_id", "pad_token_id", "bos_token_id"), 0)
+    return (BATCH_SIZE, 1), "long", f"full:{int(start)}"
+
+
+def _pixel_values(config) -> Spec:
+    channels = int(_config_value(config, ("num_channels", "in_channels", "in_chans"), 3))
+    height, width = _image_size(config)
+    frames = _config_value(config, ("num_frames",))
+    if frames:
+        return (BATCH_SIZE, int(frames), channels, height, width), "float", "randn"
+    return (BATCH_SIZE, channels, height, width), "float", "randn"
+
+
+def _pixel_mask(config) -> Spec:
+    return (BATCH_SIZE, *_image_size(config)), "long", "ones"
+
+
+def _input_features(config) -> Spec:
+    mel_bins = _config_value(config, ("num_mel_bins",))
+    if mel_bins:
+        # Whisper-style encoders expect exactly 2 * max_source_positions frames
+        frames = 2 * int(_config_value(config, ("max_source_positions",), 1500))
+        return (BATCH_SIZE, int(mel_bins), frames), "float", "randn"
+    features = int(_config_value(config, ("input_feat_per_channel",), 80))
+    channels = int(_config_value(config, ("input_channels",), 1))
+    return (BATCH_SIZE, 64, features * channels), "float", "randn"
+
+
+def _input_values(config) -> Spec:
+    mel_bins = _config_value(config, ("num_mel_bins",))
+    max_length = _config_value(config, ("max_length",))
+    if mel_bins and max_length:
+        # Spectrogram models (e.g. AST) take (batch, frames, mel bins)
+        return (BATCH_SIZE, int(max_length), int(mel_bins)), "float", "randn"
+    return (BATCH_SIZE, AUDIO_SAMPLES), "float", "randn"
+
+
+INPUT_RULES: Dict[str, Callable[[object], Spec]] = {
+    "input_ids": _input_ids,
+    "attention_mask": lambda config: ((BATCH_SIZE, SEQ_LEN), "long", "ones"),
+    "token_type_ids": lambda config: ((BATCH_SIZE, SEQ_LEN), "long", "zeros"),
+    "position_ids": lambda config: ((BATCH_SIZE, SEQ_LEN), "long", "arange"),
+    "bbox": lambda config: ((BATCH_SIZE, SEQ_LEN, 4), "long", "zeros"),
+    "decoder_input_ids": _decoder_input_ids,
+    "decoder_attention_mask": lambda config: ((BATCH_SIZE, 1), "long", "ones"),
+    "pixel_values": _pixel_values,
+    "pixel_mask": _pixel_mask,
+    "input_features": _input_features,
+    "input_values": _input_values,
+}
+
+
+def resolve_model_class(model_id: str, config):
+    """Model class for a config, without instantiating it."""
+    import transformers
+    from model_loader import load_class_index
+
+    for name in getattr(config, "architectures", None) or []:
+        cls = getattr(transformers, name, None)
+        if cls is not None:
+            return cls
+    # Fall back to the Auto class that loaded this model before
+    class_name = load_class_index().get(model_id, "AutoModel")
+    cls = getattr(transformers, class_name, transformers.AutoModel)
+    mapping = getattr(cls, "_model_mapping", None)
+    if mapping is None:
+        return cls
+    try:
+        return mapping[type(config)]
+    except KeyError:
+        raise SynthesisError(f"Cannot resolve a model class for {model_id}") from None
+
+
+def forward_signature(model_cls) -> Tuple[Tuple[str, bool], ...]:
+    """(name, required) of every named forward parameter."""
+    params = []
+    for name, param in inspect.signature(model_cls.forward).parameters.items():
+        if name == "self" or param.kind in (param.VAR_POSITIONAL, param.VAR_KEYWORD):
+            continue
+        params.append((name, param.default is param.empty))
+    return tuple(params)
+
+
+def input_specs(config, signature) -> Dict[str, Spec]:
+    names = {name for name, _ in signature}
+    wanted = [name for name in PRIMARY_INPUTS if name in names]
+    if "input_ids" in wanted:
+        wanted += [name for name in ("attention_mask", "bbox") if name in names]
+    if getattr(config, "is_encoder_decoder", False) and "decoder_input_ids" in names:
+        wanted.append("decoder_input_ids")
+    for name, required in signature:
+        if required and name not in wanted:
+            if name not in INPUT_RULES:
+                raise SynthesisError(f"No rule to synthesize required input '{name}'")
+            wanted.append(name)
+    if not wanted:
+        raise SynthesisError(f"No known inputs in forward signature {[name for name, _ in signature]}")
+    return {name: INPUT_RULES[name](config) for name in wanted}
+
+
+def cache_key(architecture: str, signature, specs: Dict[str, Spec]) -> str:
+    digest = hashlib.sha1(json.dumps([signature, sorted(specs.items())]).encode()).hexdigest()[:16]
+    return f"{architecture}-{digest}"
+
+
+def materialize(specs: Dict[str, Spec]) -> dict:
+    import torch
+
+    generator = torch.Generator().manual_seed(SEED)
+    dtypes = {"long": torch.long, "float": torch.float32}
+    inputs = {}
+    for name, (shape, dtype, fill) in specs.items():
+        dtype = dtypes[dtype]
+        if fill == "randn":
+            value = torch.randn(*shape, generator=generator, dtype=dtype)
+        elif fill == "ones":
+            value = torch.ones(*shape, dtype=dtype)
+        elif fill == "zeros":
+            value = torch.zeros(*shape, dtype=dtype)
+        elif fill == "arange":
+            value = torch.arange(shape[-1], dtype=dtype).expand(*shape).contiguous()
+        elif fill.startswith("randint:"):
+            value = torch.randint(0, int(fill.split(":")[1]), shape, generator=generator, dtype=dtype)
+        elif fill.startswith("full:"):
+            value = torch.full(shape, int(fill.split(":")[1]), dtype=dtype)
+        else:
+            raise SynthesisError(f"Unknown fill '{fill}' for {name}")
+        inputs[name] = value
+    return inputs
+
+
+class InputCache:
+    """Pickled synthesized inputs, one file per (architecture, signature) key."""
+
+    def __init__(self, cache_dir: str = CACHE_DIR):
+        self.cache_dir = cache_dir
+        self._memory: Dict[str, dict] = {}
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key + ".pkl")
+
+    def get_or_build(self, key: str, specs: Dict[str, Spec]) -> dict:
+        if key in self._memory:
+            return self._memory[key]
+        path = self.path(key)
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                inputs = pickle.load(f)
+        else:
+            inputs = materialize(specs)
+            tmp_path = path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                pickle.dump(inputs, f)
+            os.replace(tmp_path, path)
+        self._memory[key] = inputs
+        return inputs
+
+
+def synthesize_for_config(model_id: str, config, model_cls=None,
+                          cache: Optional[InputCache] = None) -> Tuple[str, dict]:
+    """Return (cache key, inputs) for a model config. Raises SynthesisError if not possible."""
+    model_cls = model_cls or resolve_model_class(model_id, config)
+    signature = forward_signature(model_cls)
+    specs = input_specs(config, signature)
+    key = cache_key(model_cls.__name__, signature, specs)
+    cache = cache or InputCache()
+    return key, cache.get_or_build(key, specs)
+
+
+def synthesize_for_model(model, cache: Optional[InputCache] = None) -> dict:
+    """Inputs for an already loaded model."""
+    model_id = getattr(model.config, "_name_or_path", type(model).__name__)
+    _, inputs = synthesize_for_config(model_id, model.config, type(model), cache)
+    return inputs
+
+
+def synthesize(model_id: str, cache: Optional[InputCache] = None) -> Tuple[str, dict]:
+    """Fetch only the config of a Hub model and synthesize its inputs."""
+    from transformers import AutoConfig
+    from model_loader import WarmWeightCache
+
+    config = AutoConfig.from_pretrained(model_id, trust_remote_code=True,
+                                        cache_dir=WarmWeightCache().cache_dir)
+    return synthesize_for_config(model_id, config, cache=cache)
+
+
+def write_inputs(model_family: str, model_ids: List[str], overwrite: bool = False,
+                 inputs_dir: str = INPUTS_DIR, cache: Optional[InputCache] = None) -> Tuple[int, int]:
+    """Write inputs/<family>/<org--model>.pkl for every model. Returns (written, failed)."""
+    family_dir = os.path.join(inputs_dir, model_family)
+    os.makedirs(family_dir, exist_ok=True)
+    cache = cache or InputCache()
+    written = failed = 0
+    for model_id in model_ids:
+        path = os.path.join(family_dir, model_id.replace("/", "--") + ".pkl")
+        if os.path.exists(path) and not overwrite:
+            continue
+        try:
+            key, _ = synthesize(model_id, cache)
+        except Exception as e:
+            print(f"[!] Cannot synthesize inputs for {model_id}: {e}")
+            failed += 1
+            continue
+        shutil.copyfile(cache.path(key), path)
+        print(f"[+] {model_id}: {key}")
+        written += 1
+    return written, failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Synthesize minimal model inputs from configs.")
+    parser.add_argument('models', nargs='*',
+                        help='Model ids (default: the top models of --family)')
+    parser.add_argument('--family', default=None,
+                        help='Model family to write inputs for (default: every family)')
+    parser.add_argument('--top', type=int, default=30,
+                        help='Number of top models per family when no model ids are given')
+    parser.add_argument('--overwrite', action='store_true',
+                        help='Replace existing input files')
+    args = parser.parse_args()
+
+    if args.models:
+        if args.family is None:
+            parser.error("--family is required when model ids are given")
+        targets = {args.family: args.models}
+    else:
+        from pull_hf_models import default_client, fetch_top_models, model_family_dict
+
+        client = default_client()
+        families = [args.family] if args.family else sorted(set(model_family_dict.values()))
+        targets = {family: fetch_top_models(args.top, family, client=client) for family in families}
+
+    cache = InputCache()
+    for family, model_ids in targets.items():
+        written, failed = write_inputs(family, model_ids, overwrite=args.overwrite, cache=cache)
+        print(f"[+] {family}: {written} written, {failed} failed")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,11 +1,9 @@
 import pickle
-import shutil
-import os
+from model_loader import WarmWeightCache
 
-# Delete the Hugging Face cache directory if it exists
-cache_dir = os.path.expanduser("~/.cache/huggingface")
-if os.path.exists(cache_dir):
-    shutil.rmtree(cache_dir)
+# Keep the Hugging Face cache within its size budget instead of wiping it,
+# so the explain stage can reuse the weights downloaded here
+WarmWeightCache().evict()
 
 ###### INSERT USAGE HERE ######
 from transformers import WhisperProcessor, WhisperForConditionalGeneration
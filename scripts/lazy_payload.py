@@ -0,0 +1,42 @@
+"""
+lazy_payload.py
+
+Read-only sequences for the heavy payloads of DynamoExplainData (graph text,
+ops per graph) that are only produced when an item is accessed.
+
+  LazySequence    items come from a loader callback, e.g. rendering an FX graph
+                  or reading a blob row. Pickling materializes the items.
+"""
+
+from collections.abc import Sequence
+from typing import Any, Callable
+
+
+class LazySequence(Sequence):
+    def __init__(self, length: int, loader: Callable[[int], Any]):
+        self._length = length
+        self._loader = loader
+
+    def __len__(self):
+        return self._length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._length))]
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("lazy payload index out of range")
+        return self._loader(index)
+
+    def __eq__(self, other):
+        if isinstance(other, (Sequence, list)) and not isinstance(other, str):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    def __repr__(self):
+        return f"<{type(self).__name__} of {self._length} items>"
+
+    def __reduce__(self):
+        return (list, (list(self),))
+
@@ -0,0 +1,99 @@
+"""
+loki_log_sink.py
+
+Shared writer for the logfmt compile-break logs that Alloy tails into Loki.
+
+LokiLogSink keeps one buffered handle per log file (at most `max_open` at a
+time, least recently used handles are closed first), flushes every
+`flush_every` records, and rotates a file to <name>.1, <name>.2, ... once it
+grows past `max_bytes`. Values are quoted and escaped following logfmt rules,
+so reasons or families containing spaces, quotes or newlines stay parseable.
+"""
+
+import os
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict
+
+
+def logfmt_value(value) -> str:
+    text = str(value)
+    if text and not any(c in text for c in ' ="\\\n\r\t'):
+        return text
+    escaped = (
+        text.replace("\\", "\\\\")
+        .replace('"', '\\"')
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+        .replace("\t", "\\t")
+    )
+    return f'"{escaped}"'
+
+
+def format_logfmt(level: str, fields: Dict[str, object]) -> str:
+    pairs = " ".join(f"{key}={logfmt_value(value)}" for key, value in fields.items())
+    return f"{level}: {pairs}\n"
+
+
+class LokiLogSink:
+    def __init__(self, max_bytes: int = 50 * 1024 * 1024, backup_count: int = 5,
+                 flush_every: int = 1000, max_open: int = 64, buffer_size: int = 1 << 16):
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.flush_every = flush_every
+        self.max_open = max_open
+        self.buffer_size = buffer_size
+        self._handles = OrderedDict()  # path -> [file, bytes written, records since flush]
+
+    def _open(self, path: Path):
+        entry = self._handles.get(path)
+        if entry is not None:
+            self._handles.move_to_end(path)
+            return entry
+        if len(self._handles) >= self.max_open:
+            _, (oldest, _, _) = self._handles.popitem(last=False)
+            oldest.close()
+        f = open(path, "a", buffering=self.buffer_size, encoding="utf-8")
+        entry = [f, f.tell(), 0]
+        self._handles[path] = entry
+        return entry
+
+    def _rotate(self, path: Path):
+        f, _, _ = self._handles.pop(path)
+        f.close()
+        if self.backup_count > 0:
+            for i in range(self.backup_count - 1, 0, -1):
+                src = Path(f"{path}.{i}")
+                if src.exists():
+                    os.replace(src, f"{path}.{i + 1}")
+            os.replace(path, f"{path}.1")
+        else:
+            os.remove(path)
+
+    def write(self, log_file, level: str = "INFO", **fields):
+        path = Path(log_file)
+        entry = self._open(path)
+        line = format_logfmt(level, fields)
+        entry[0].write(line)
+        entry[1] += len(line.encode("utf-8"))
+        entry[2] += 1
+        if entry[2] >= self.flush_every:
+            entry[0].flush()
+            entry[2] = 0
+        if entry[1] >= self.max_bytes:
+            self._rotate(path)
+
+    def flush(self):
+        for f, _, _ in self._handles.values():
+            f.flush()
+
+    def close(self):
+        while self._handles:
+            _, (f, _, _) = self._handles.popitem()
+            f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -9,18 +9,23 @@ from pathlib import Path
 # from dynamo_explain_parser import DynamoExplainParser
 from prometheus_client import CollectorRegistry, Counter, Gauge, push_to_gateway, generate_latest
 from mock_dynamo_explain_data import load_mock_dynamo_explain_data
+from loki_log_sink import LokiLogSink
+from break_reason_taxonomy import categorize
 
 output_dir = Path("scripts/metrics")
 output_dir.mkdir(parents=True, exist_ok=True)
 PUSHGATEWAY_URL = "http://pushgateway:9091"
 
+# one buffered handle per Loki log file for the whole run
+log_sink = LokiLogSink()
+
 # group and isolate metrics in its own registry
 registry = CollectorRegistry()
 
 break_reasons_counter = Counter(
     "break_reasons_counter",
-    "Break reasons per commit",
-    ["model_family", "model_name", "model_commit", "reason"],
+    "Break reasons per model, by bounded reason category",
+    ["model_family", "model_name", "reason_category"],
     registry=registry
 )
 
@@ -39,14 +44,14 @@ compile_time_gauge = Gauge(
 )
 
 def record(model_family, model_name, model_commit, reason, log_file):
-    # increment Prometheus counter
-    break_reasons_counter.labels(model_family, model_name, model_commit, reason).inc()
+    # increment Prometheus counter; the commit and full text only go to Loki
+    reason_category = categorize(reason)
+    break_reasons_counter.labels(model_family, model_name, reason_category).inc()
 
     # append to Loki log
     ts = int(time.time()*1e9)
-    log_file.open("a").write(
-        f"INFO: time={ts} model_family={model_family} model_name={model_name} model_commit={model_commit} reason=\"{reason}\"\n"
-    )
+    log_sink.write(log_file, time=ts, model_family=model_family, model_name=model_name,
+                   model_commit=model_commit, reason_category=reason_category, reason=reason)
 
 def flush(job_name="compile_breaks", grouping_key=None):
     push_to_gateway(
@@ -82,6 +87,8 @@ for data, model_info in zip(mock_dynamo_explain_data, mock_model_info):
     with prom_file.open("w") as f:
         f.write(generate_latest().decode())
 
+log_sink.close()
+
     # # save dynamo.explain output to text file
     # with open("metrics/dynamo_explanation.txt", "w") as f:
     #     f.write(str(explanation))
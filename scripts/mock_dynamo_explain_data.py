@@ -1,7 +1,7 @@
 import json
 from typing import List, Optional
 from dataclasses import dataclass
-from dynamo_explain_parser import DynamoExplainData, BreakReason, CompileTime
+from dynamo_explain_data import DynamoExplainData, BreakReason, CompileTime
 
 @dataclass
 class MockModelInfo:
@@ -0,0 +1,185 @@
+"""
+model_loader.py
+
+Loads Hugging Face models for the explain runs.
+
+  - The model config is read once and shared by every Auto class attempt.
+  - The Auto class that worked for a model is remembered in a resolved-class
+    index (model_class_index.json), so later runs try it first instead of
+    walking the fallback list again.
+  - Weights are loaded from safetensors where available. safetensors files are
+    memory-mapped, which avoids an extra copy of every tensor.
+  - Downloads go to a warm weight cache with size-based LRU eviction
+    (MODEL_CACHE_DIR, default ~/.cache/huggingface/hub, capped at
+    MODEL_CACHE_MAX_GB, default 100). Re-running an unchanged model never
+    downloads its weights again. Loads hold a shared lock on the cache and
+    eviction an exclusive one, and the explain stage only evicts from its
+    parent process once every worker is done, so a snapshot is never deleted
+    while a model is being loaded from it.
+"""
+
+import os
+import json
+import shutil
+import tempfile
+from contextlib import contextmanager
+from typing import Dict, Iterable, Optional
+
+CLASS_INDEX_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "model_class_index.json")
+DEFAULT_CACHE_DIR = os.path.expanduser("~/.cache/huggingface/hub")
+
+FALLBACK_CLASS_NAMES = [
+    "AutoModel",
+    "AutoModelForCausalLM",
+    "AutoModelForSeq2SeqLM",
+    "AutoModelForMaskedLM",
+    "AutoModelForTokenClassification",
+    "AutoModelForSequenceClassification",
+    "AutoModelForQuestionAnswering",
+    "AutoModelForImageClassification",
+    "AutoModelForVision2Seq",
+    "AutoModelForSpeechSeq2Seq",
+    "AutoModelForAudioClassification",
+    "AutoModelForCTC",
+    "AutoModelForImageTextToText",
+    "RTDetrForObjectDetection",
+    "VitPoseForPoseEstimation",
+    "Dinov2Model",
+]
+
+
+@contextmanager
+def _flock(path: str, exclusive: bool = True):
+    """Advisory lock on `path`, held across processes."""
+    import fcntl
+
+    with open(path, "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def load_class_index(path: str = CLASS_INDEX_FILE) -> Dict[str, str]:
+    if os.path.exists(path):
+        with open(path, "r") as f:
+            return json.load(f)
+    return {}
+
+
+def save_class_index_entry(model_id: str, class_name: str, path: str = CLASS_INDEX_FILE):
+    """Record one entry, merging with whatever other workers wrote meanwhile.
+
+    The index is re-read and replaced under an exclusive lock on <path>.lock, so
+    concurrent workers never drop each other's entries.
+    """
+    with _flock(path + ".lock"):
+        index = load_class_index(path)
+        if index.get(model_id) == class_name:
+            return
+        index[model_id] = class_name
+        directory = os.path.dirname(os.path.abspath(path))
+        with tempfile.NamedTemporaryFile("w", dir=directory, delete=False, suffix=".tmp") as f:
+            json.dump(index, f, indent=2, sort_keys=True)
+        os.replace(f.name, path)
+
+
+class WarmWeightCache:
+    """Hugging Face hub cache directory with size-based LRU eviction of whole repos."""
+
+    def __init__(self, cache_dir: Optional[str] = None, max_bytes: Optional[int] = None):
+        self.cache_dir = cache_dir or os.getenv("MODEL_CACHE_DIR") or DEFAULT_CACHE_DIR
+        if max_bytes is None:
+            max_bytes = int(float(os.getenv("MODEL_CACHE_MAX_GB", "100")) * 1024 ** 3)
+        self.max_bytes = max_bytes
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def lock(self, exclusive: bool = False):
+        """Shared lock while loading from the cache, exclusive while evicting; held across processes."""
+        return _flock(os.path.join(self.cache_dir, ".lock"), exclusive)
+
+    def repo_dir(self, model_id: str) -> str:
+        return os.path.join(self.cache_dir, "models--" + model_id.replace("/", "--"))
+
+    def touch(self, model_id: str):
+        """Mark a model as just used."""
+        path = self.repo_dir(model_id)
+        if os.path.isdir(path):
+            os.utime(path)
+
+    @staticmethod
+    def _size(path: str) -> int:
+        total = 0
+        for root, _, files in os.walk(path):
+            for name in files:
+                file_path = os.path.join(root, name)
+                # blobs hold the data; snapshots are symlinks into them
+                if not os.path.islink(file_path):
+                    total += os.path.getsize(file_path)
+        return total
+
+    def evict(self, keep: Iterable[str] = ()):
+        """Delete least recently used repos until the cache fits in max_bytes."""
+        with self.lock(exclusive=True):
+            self._evict({self.repo_dir(model_id) for model_id in keep})
+
+    def _evict(self, keep_dirs):
+        repos = []
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            if name.startswith("models--") and os.path.isdir(path):
+                repos.append((os.path.getmtime(path), self._size(path), path))
+        total = sum(size for _, size, _ in repos)
+        for _, size, path in sorted(repos):
+            if total <= self.max_bytes:
+                break
+            if path in keep_dirs:
+                continue
+            print(f"[*] Evicting {os.path.basename(path)} ({size / 1024 ** 2:.0f} MB) from the weight cache")
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+
+
+def _from_pretrained(cls, model_id: str, config, cache_dir: str):
+    kwargs = dict(trust_remote_code=True, cache_dir=cache_dir, low_cpu_mem_usage=True)
+    if config is not None:
+        kwargs["config"] = config
+    try:
+        return cls.from_pretrained(model_id, use_safetensors=True, **kwargs)
+    except (OSError, EnvironmentError):
+        # No safetensors weights published for this model
+        return cls.from_pretrained(model_id, **kwargs)
+
+
+def load_model(model_id: str, cache: Optional[WarmWeightCache] = None,
+               index_path: str = CLASS_INDEX_FILE):
+    """Load a model through the weight cache; the caller evicts (see WarmWeightCache.evict)."""
+    cache = cache or WarmWeightCache()
+    with cache.lock():
+        return _load_model(model_id, cache, index_path)
+
+
+def _load_model(model_id: str, cache: WarmWeightCache, index_path: str):
+    import transformers
+    from transformers import AutoConfig
+
+    try:
+        config = AutoConfig.from_pretrained(model_id, trust_remote_code=True, cache_dir=cache.cache_dir)
+    except Exception:
+        config = None
+
+    known = load_class_index(index_path).get(model_id)
+    class_names = [known] + [name for name in FALLBACK_CLASS_NAMES if name != known] if known else FALLBACK_CLASS_NAMES
+    for class_name in class_names:
+        cls = getattr(transformers, class_name, None)
+        if cls is None:
+            continue
+        try:
+            model = _from_pretrained(cls, model_id, config, cache.cache_dir)
+        except Exception:
+            continue
+        save_class_index_entry(model_id, class_name, index_path)
+        cache.touch(model_id)
+        return model
+    raise RuntimeError(f"Could not load any supported AutoModel for {model_id}")
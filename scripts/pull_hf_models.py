@@ -22,29 +22,16 @@ import json
 import time
 import argparse
 import dataclasses
-from typing import List, Dict
+from typing import List, Dict, Optional
 import shutil
 
-import inspect
-import numpy as np
-import umap
-
-# Try to import HF client; fallback HTTP if needed
-try:
-    from huggingface_hub import HfApi, ModelInfo
-except ImportError:
-    HfApi = None
-import requests
-
-# TorchDynamo & HF model loading
-import torch
-import torch._dynamo as dynamo
-from transformers import AutoModel
-
-# Parser and metrics
-from dynamo_explain_parser import DynamoExplainParser, DynamoExplainData
-# from collect_compile_breaks import record, flush
-# from run_model_sample_code import get_model_sample_code
+from concurrent.futures import ThreadPoolExecutor
+
+from hf_hub_client import HubClient
+from hub_metadata_cache import HubMetadataCache
+
+# torch, transformers and numpy are imported inside the functions that need
+# them, so listing models starts without loading them
 import ast
 
 # File paths
@@ -109,15 +96,15 @@ model_family_dict = {
 
 ### Helper Functions ###
 
-def load_state() -> Dict[str, str]:
-    if os.path.exists(STATE_FILE):
-        with open(STATE_FILE, "r") as f:
+def load_state(path: str = STATE_FILE) -> Dict[str, dict]:
+    if os.path.exists(path):
+        with open(path, "r") as f:
             return json.load(f)
     return {}
 
 
-def save_state(state: Dict[str, str]):
-    with open(STATE_FILE, "w") as f:
+def save_state(state: Dict[str, dict], path: str = STATE_FILE):
+    with open(path, "w") as f:
         json.dump(state, f, indent=2)
 
 
@@ -129,12 +116,20 @@ def save_results(results: Dict[str, dict]):
     print(f"[+] Saved analysis results to {OUTPUT_FILE}")
 
 def count_trainable_parameters(model):
+    import numpy as np
+
     model_parameters = filter(lambda p: p.requires_grad, model.parameters())
     params = sum([np.prod(p.size()) for p in model_parameters])
     return params
 
 
-def fetch_top_models(limit: int, model_family: str) -> List[str]:
+def default_client(offline: bool = None) -> HubClient:
+    """Hub client backed by the shared on-disk metadata cache."""
+    return HubClient(cache=HubMetadataCache(offline=offline))
+
+
+def fetch_top_models(limit: int, model_family: str, client: HubClient = None,
+                     max_workers: Optional[int] = None) -> List[str]:
         models = []
         model_infos = []
         # Build tasks list for the given model_family
@@ -145,100 +140,69 @@ def fetch_top_models(limit: int, model_family: str) -> List[str]:
         else:
                 print(f"[+] Tasks for model_family '{model_family}': {tasks}")
 
-        if HfApi:
-                api = HfApi()
+        client = client or default_client()
+
+        def list_task(task):
+                return client.list_models(pipeline_tag=task, limit=limit, expand=['safetensors', 'downloads'])
+
+        # List every task concurrently; results are merged in task order so the
+        # output does not depend on which request finishes first
+        if max_workers is None:
+                # More threads than pooled connections or the rate limit burst would only queue
+                max_workers = min(client.pool_size, client.limiter.burst)
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(tasks)))) as pool:
+                futures = [pool.submit(list_task, task) for task in tasks]
                 seen_ids = set()
-                # Collect all models for each task
-                for task in tasks:
+                for task, future in zip(tasks, futures):
                         try:
-                                infos = api.list_models(limit=limit, sort="trending_score", direction=-1, pipeline_tag=task, expand=['safetensors', 'downloads'])
-                                for m in infos:
-                                        if m.id not in seen_ids:
-                                                model_infos.append(m)
-                                                seen_ids.add(m.id)
+                                infos = future.result()
                         except Exception as e:
                                 print(f"[!] Error fetching models for task '{task}': {e}")
                                 continue
-                # Sort all collected models by downloads (descending)
-                # Filter out models where safetensors.parameters >= 1 billion
-                def has_large_safetensors(m):
-                        try:
-                                params = m.safetensors.total
-                                return params >= 500_000_000 or m.downloads < 100
-                        except Exception:
-                                return True
-
-                print(len( model_infos), "models found")
-                model_infos = [m for m in model_infos if not has_large_safetensors(m)]
-                model_infos.sort(key=lambda m: getattr(m, "downloads", 0), reverse=True)
-                count = 0
-                for m in model_infos:
-                        if count >= limit:
-                                break
-                        models.append(m.id)
-                        count += 1
-                return models
-        print("Uh oh")
+                        for m in infos:
+                                if m["id"] not in seen_ids:
+                                        model_infos.append(m)
+                                        seen_ids.add(m["id"])
+
+        # Sort all collected models by downloads (descending)
+        # Filter out models where safetensors.parameters >= 500 million
+        def has_large_safetensors(m):
+                try:
+                        params = m["safetensors"]["total"]
+                        return params >= 500_000_000 or m["downloads"] < 100
+                except Exception:
+                        return True
+
+        print(len( model_infos), "models found")
+        model_infos = [m for m in model_infos if not has_large_safetensors(m)]
+        model_infos.sort(key=lambda m: m.get("downloads", 0), reverse=True)
+        for m in model_infos[:limit]:
+                models.append(m["id"])
         return models
 
 
-def get_latest_commit(model_id: str, api) -> str:
-    commits = api.list_repo_commits(model_id)
-    if not commits:
-        return ""
-    return commits[0].commit_id
+def get_latest_commit(model_id: str, client: HubClient = None) -> str:
+    client = client or default_client()
+    return client.latest_commit(model_id)
 
 
 def build_model_inputs(model):
     """
-    Inspect model.forward signature and:
-      - For text models (input_ids), patch forward to inject UMAP/seq-length hack,
-        and return a dummy input_ids tensor.
-      - For vision models (pixel_values), return a dummy image tensor.
+    Synthesize minimal inputs from the model config and forward signature
+    (see input_synthesis.py) and:
+      - For text models (input_ids), patch forward to inject the default
+        graph-break perturbations (see graph_break_perturbations.py).
     """
-    sig = inspect.signature(model.forward)
-    params = list(sig.parameters.keys())
+    from graph_break_perturbations import apply_perturbations
+    from input_synthesis import synthesize_for_model
+
     device = next(model.parameters()).device
+    inputs = {name: value.to(device) for name, value in synthesize_for_model(model).items()}
 
     # TEXT MODELS
-    if "input_ids" in params:
-        # patch forward to refine inputs
-        model.original_forward = model.forward
-
-        def forward_refined(**kwargs):
-            input_ids = kwargs["input_ids"]
-            seq_len = input_ids.shape[1]
-            mod_ids = input_ids.clone()
-            mod_ids[0, 0] += seq_len
-
-            arr = input_ids.cpu().numpy()
-            reducer = umap.UMAP(n_neighbors=2, n_components=2, random_state=42)
-            emb = reducer.fit_transform(arr)
-            umap_val = torch.tensor(emb[0, 0],
-                                   dtype=mod_ids.dtype,
-                                   device=mod_ids.device)
-            mod_ids[0, 0] += umap_val
-
-            kwargs["input_ids"] = mod_ids
-            return model.original_forward(**kwargs)
-
-        model.forward = forward_refined
-        # return a dummy batch of token indices
-        return {"input_ids": torch.ones(1, 10, dtype=torch.long, device=device)}
-    # VISION MODELS
-    elif "pixel_values" in params:
-        img_size = getattr(model.config, "image_size", 224)
-        # no patching: just random image
-        return {
-            "pixel_values": torch.randn(1, 3, img_size, img_size,
-                                        dtype=torch.float32,
-                                        device=device)
-        }
-    else:
-        raise RuntimeError(
-            f"Cannot auto-build inputs for model; "
-            f"forward signature keys: {params}"
-        )
+    if "input_ids" in inputs:
+        apply_perturbations(model)
+    return inputs
  
 
 # def analyze_model_raw(model_id: str) -> DynamoExplainData:
@@ -302,15 +266,16 @@ def build_model_inputs(model):
 #     return data
 
 
-def single_scan(n: int):
+def single_scan(n: int, offline: bool = False):
     """Print top-N models."""
-    for i, mid in enumerate(fetch_top_models(n, model_family='Computer Vision'), start=1):
+    client = default_client(offline=offline or None)
+    for i, mid in enumerate(fetch_top_models(n, model_family='Computer Vision', client=client), start=1):
         print(f"{i:2d}. {mid}")
 
 
 # def scheduled_scan(n: int):
 #     """One-time scan: detect new commits, analyze, record metrics, save results."""
-#     api = HfApi()                  
+#     api = default_client()
 #     last = load_state()
 #     new_state = {}
 #     results = {}
@@ -341,6 +306,8 @@ def main():
                         help='Continuously poll for new commits')
     parser.add_argument('--interval', type=int, default=3600,
                         help='Polling interval in seconds for watch mode')
+    parser.add_argument('--offline', action='store_true',
+                        help='Serve Hub metadata entirely from the local cache')
     args = parser.parse_args()
 
     # Scheduled scan via env var
@@ -350,7 +317,7 @@ def main():
     # else:
     #     single_scan(args.N)
 
-    single_scan(args.N)
+    single_scan(args.N, offline=args.offline)
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
@@ -0,0 +1,173 @@
+"""
+report_builder.py
+
+Builds a static HTML site with the explain report of every model: one page per
+model (the DynamoExplainViewer report) plus an index.html that can be searched
+and sorted by family, break count and compile time.
+
+Legacy <family>/*.pkl results under dynamo_explain_output/ are converted into
+the result store first, so the site covers the whole tree. Pages are rendered
+by a pool of worker processes; each worker compiles the Jinja environment and
+template once and keeps one store connection open.
+
+A page is only re-rendered when the content hash of its result (see
+ResultStore.content_hash) or the report templates changed since the last build.
+Hashes are kept in manifest.json in the output directory.
+
+Usage:
+  python report_builder.py [--output-dir reports] [--workers W] [--store PATH] [--force]
+"""
+
+import os
+import json
+import shutil
+import hashlib
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, Optional
+
+from result_store import DEFAULT_STORE_PATH, ResultStore, convert_pickles
+
+OUTPUT_DIR = "reports"
+MANIFEST_FILE = "manifest.json"
+INDEX_TEMPLATE = "report_index_template.html"
+STYLE_FILE = "dynamo_explain_style.css"
+TEMPLATE_FILES = ("dynamo_explain_template.html", INDEX_TEMPLATE, STYLE_FILE)
+
+
+def templates_hash() -> str:
+    from dynamo_explain_viewer import TEMPLATE_DIR
+
+    digest = hashlib.sha1()
+    for name in TEMPLATE_FILES:
+        with open(os.path.join(TEMPLATE_DIR, name), "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def page_name(model_family: str, model_name: str) -> str:
+    return f"{model_family}__{model_name}".replace("/", "--").replace(" ", "_") + ".html"
+
+
+# Per-worker state, set up once by _init_worker
+_store: Optional[ResultStore] = None
+
+
+def _init_worker(store_path: str):
+    global _store
+    from dynamo_explain_viewer import get_template
+
+    get_template()
+    _store = ResultStore(store_path)
+
+
+def render_page(result_id: int, path: str) -> str:
+    from dynamo_explain_viewer import DynamoExplainViewer
+
+    data = _store.load(result_id)
+    return DynamoExplainViewer.write_html(data, path)
+
+
+def load_manifest(output_dir: Path) -> dict:
+    path = output_dir / MANIFEST_FILE
+    if path.exists():
+        return json.loads(path.read_text())
+    return {}
+
+
+def write_index(output_dir: Path, models: Dict[str, dict]):
+    from dynamo_explain_viewer import get_template
+
+    rows = sorted(models.values(), key=lambda m: (-m["graph_break_count"], m["model_name"]))
+    stream = get_template(INDEX_TEMPLATE).stream(models=rows)
+    stream.dump(str(output_dir / "index.html"), encoding="utf-8")
+
+
+def build(output_dir: Path, store_path: str = DEFAULT_STORE_PATH, workers: Optional[int] = None,
+          force: bool = False) -> Dict[str, int]:
+    """Render every changed model page and the index. Returns counts of rendered, skipped and failed pages."""
+    from dynamo_explain_viewer import TEMPLATE_DIR
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+    shutil.copyfile(os.path.join(TEMPLATE_DIR, STYLE_FILE), output_dir / STYLE_FILE)
+
+    manifest = load_manifest(output_dir)
+    template_digest = templates_hash()
+    if manifest.get("templates") != template_digest:
+        force = True
+    previous = manifest.get("models", {})
+    models = {}
+    to_render = []
+
+    with ResultStore(store_path) as store:
+        convert_pickles(Path(os.path.dirname(os.path.abspath(store_path))), store)
+        for summary in store.summaries(latest_only=True):
+            key = f"{summary.model_family}/{summary.model_name}"
+            entry = {
+                "model_family": summary.model_family,
+                "model_name": summary.model_name,
+                "model_commit": summary.model_commit,
+                "torch_version": summary.torch_version,
+                "graph_count": summary.graph_count,
+                "graph_break_count": summary.graph_break_count,
+                "op_count": summary.op_count,
+                "compile_time": summary.compile_time,
+                "page": page_name(summary.model_family, summary.model_name),
+                "hash": store.content_hash(summary.id),
+            }
+            models[key] = entry
+            old = previous.get(key)
+            if force or old is None or old["hash"] != entry["hash"] or not (output_dir / entry["page"]).exists():
+                to_render.append((key, summary.id))
+
+    counts = {"rendered": 0, "skipped": len(models) - len(to_render), "failed": 0}
+    if to_render:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(store_path,)) as pool:
+            futures = {
+                pool.submit(render_page, result_id, str(output_dir / models[key]["page"])): key
+                for key, result_id in to_render
+            }
+            for future in as_completed(futures):
+                key = futures[future]
+                try:
+                    future.result()
+                except Exception as e:
+                    print(f"[!] Failed to render {key}: {e}")
+                    counts["failed"] += 1
+                    # Keep the old hash (or none) so the page is retried next time
+                    if key in previous:
+                        models[key]["hash"] = previous[key]["hash"]
+                    else:
+                        del models[key]
+                    continue
+                counts["rendered"] += 1
+
+    write_index(output_dir, models)
+    (output_dir / MANIFEST_FILE).write_text(
+        json.dumps({"templates": template_digest, "models": models}, indent=2, sort_keys=True)
+    )
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build a static site with the explain report of every model.")
+    parser.add_argument('--output-dir', default=OUTPUT_DIR,
+                        help='Directory to write the site to')
+    parser.add_argument('--store', default=DEFAULT_STORE_PATH,
+                        help='Result store to read')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Number of render processes (default: one per CPU)')
+    parser.add_argument('--force', action='store_true',
+                        help='Re-render every page, even if unchanged')
+    args = parser.parse_args()
+
+    output_dir = Path(args.output_dir)
+    counts = build(output_dir, args.store, args.workers, args.force)
+    print(f"[+] {counts['rendered']} page(s) rendered, {counts['skipped']} unchanged, "
+          f"{counts['failed']} failed; index at {output_dir / 'index.html'}")
+
+
+if __name__ == '__main__':
+    main()
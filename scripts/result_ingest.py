@@ -0,0 +1,125 @@
+"""
+result_ingest.py
+
+Streaming ingestion of explain results for the collector.
+
+A walker lazily enumerates work (newest store result per model, plus legacy
+<family>/*.pkl files that were never converted into the store), a pool of
+decoder processes turns each item into a small IngestedResult, and the caller's
+single aggregator consumes them as they complete. At most `max_in_flight`
+items are outstanding at any time, so memory stays constant no matter how many
+results there are, and only summaries and break reasons cross process
+boundaries.
+"""
+
+import pickle
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from result_store import ResultStore, iter_pickles
+
+
+@dataclass
+class IngestedResult:
+    model_family: str
+    model_name: str
+    graph_break_count: int
+    compile_time: Optional[float]
+    reasons: List[str]
+    speedup: Optional[float] = None
+    compile_phases: Optional[Dict[str, float]] = None
+    graph_compile_times: Optional[List[float]] = None
+
+
+# One store connection per decoder process, opened on first use
+_worker_stores = {}
+
+
+def decode_store_result(store_path: str, result_id: int) -> IngestedResult:
+    store = _worker_stores.get(store_path)
+    if store is None:
+        store = _worker_stores[store_path] = ResultStore(store_path)
+    summary = store.summary(result_id)
+    phases = store.compile_phases(result_id) or {}
+    return IngestedResult(
+        summary.model_family,
+        summary.model_name,
+        summary.graph_break_count,
+        summary.compile_time,
+        [reason for _, reason in store.break_reasons(result_id)],
+        (store.runtime(result_id) or {}).get("speedup"),
+        phases.get("phases"),
+        phases.get("per_graph"),
+    )
+
+
+def decode_pickle(model_family: str, model_name: str, path: str) -> IngestedResult:
+    with open(path, "rb") as f:
+        data = pickle.load(f)
+    additional = data.additional_data or {}
+    phases = additional.get("compile_phases", {})
+    return IngestedResult(
+        model_family,
+        model_name,
+        data.graph_break_count,
+        data.compile_times.total_time if data.compile_times else None,
+        [br.reason for br in data.break_reasons],
+        additional.get("runtime", {}).get("speedup"),
+        phases.get("phases"),
+        phases.get("per_graph"),
+    )
+
+
+def walk_results(store: ResultStore, input_dir: Optional[Path] = None,
+                 since: Optional[float] = None) -> Iterable[Tuple[Callable, tuple]]:
+    """Lazily yield (decoder, args) work items for every result newer than `since`."""
+    for result_id in store.iter_latest_ids(since):
+        yield decode_store_result, (store.path, result_id)
+
+    if input_dir is None or not input_dir.is_dir():
+        return
+    for model_family, model_name, pkl_file in iter_pickles(input_dir):
+        mtime = pkl_file.stat().st_mtime
+        if since is not None and mtime <= since:
+            continue
+        if store.has_source(str(pkl_file.resolve()), mtime):
+            continue
+        yield decode_pickle, (model_family, model_name, str(pkl_file))
+
+
+def ingest(work: Iterable[Tuple[Callable, tuple]], consume: Callable[[IngestedResult], None],
+           workers: Optional[int] = None, max_in_flight: int = 64) -> Tuple[int, int]:
+    """
+    Decode work items in a process pool and hand each result to `consume` on the
+    calling thread. Returns (ingested, failed).
+    """
+    ingested = failed = 0
+    work = iter(work)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        in_flight = {}
+        exhausted = False
+        while True:
+            # Top up to the in-flight bound; the walker is only advanced when there is room
+            while not exhausted and len(in_flight) < max_in_flight:
+                item = next(work, None)
+                if item is None:
+                    exhausted = True
+                    break
+                decoder, args = item
+                in_flight[pool.submit(decoder, *args)] = args
+            if not in_flight:
+                break
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                args = in_flight.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    print(f"Failed to load {args[-1]}: {e}")
+                    failed += 1
+                    continue
+                consume(result)
+                ingested += 1
+    return ingested, failed
@@ -0,0 +1,610 @@
+"""
+result_store.py
+
+Append-only store for parsed dynamo explain results, replacing one pickle per
+model. Results live in a single SQLite file split into:
+
+  results        one summary row per run: family, model, commit, torch version,
+                 Jenkins build, graph/break/op counts and total compile time
+  strings        every distinct break reason and user stack, stored once
+  breaks         (result_id, number, reason_id, stack_id) rows pointing into
+                 strings; break_reasons is a view with the reason text
+  runtime_stats  eager vs compiled latency, throughput and peak memory, plus
+                 the speedup (see runtime_profile.py)
+  compile_phases per-phase compile seconds (Dynamo tracing, backend,
+                 AOTAutograd, Inductor; see compile_phases.py)
+  graph_compile_times  compile seconds of every compiled frame
+  reason_index / frame_index  distinct reasons by normalized reason and
+                 distinct stacks by frame (see break_index.py)
+  blobs          zlib-compressed JSON payloads: graphs, ops per graph, guards,
+                 compile time details and other additional data
+
+Nothing is ever overwritten, so the store doubles as the history of every
+model across commits, torch versions and builds (see break_history.py). A
+nightly run that breaks the same way as the last one only adds its results
+row and a few integers per break.
+
+Collectors and dashboards only ever read the summary tables above; the
+heavy payloads are read back only by `ResultStore.load`, which by default
+fetches graphs and ops per graph lazily as they are accessed.
+
+Usage:
+  # Convert existing <family>/*.pkl outputs into the store
+  python result_store.py convert [--input-dir DIR] [--store PATH]
+
+  # Append the results of other stores (e.g. per-shard stores) to this one
+  python result_store.py merge SHARD_STORE [SHARD_STORE ...] [--store PATH]
+"""
+
+import os
+import json
+import time
+import zlib
+import hashlib
+import itertools
+import pickle
+import sqlite3
+import argparse
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from dynamo_explain_data import DynamoExplainData, BreakReason, CompileTime
+from break_index import index_reason, index_stack
+from compile_phases import COMPILE_PHASES_KEY as COMPILE_PHASES
+from lazy_payload import LazySequence
+from runtime_profile import RUNTIME_KEY as RUNTIME
+
+DEFAULT_STORE_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "dynamo_explain_output", "results.sqlite"
+)
+# Results of torch_matrix.py runs, one per model and torch version
+TORCH_MATRIX_STORE_PATH = os.path.join(os.path.dirname(DEFAULT_STORE_PATH), "torch_matrix.sqlite")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    model_family TEXT NOT NULL,
+    model_name TEXT NOT NULL,
+    model_commit TEXT,
+    torch_version TEXT,
+    created_at REAL NOT NULL,
+    source TEXT,
+    graph_count INTEGER NOT NULL,
+    graph_break_count INTEGER NOT NULL,
+    op_count INTEGER NOT NULL,
+    compile_time REAL,
+    build TEXT
+);
+CREATE INDEX IF NOT EXISTS results_by_model ON results (model_family, model_name, id);
+CREATE TABLE IF NOT EXISTS strings (
+    id INTEGER PRIMARY KEY,
+    digest BLOB NOT NULL UNIQUE,
+    text TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS breaks (
+    result_id INTEGER NOT NULL REFERENCES results (id),
+    number INTEGER NOT NULL,
+    reason_id INTEGER NOT NULL REFERENCES strings (id),
+    stack_id INTEGER REFERENCES strings (id),
+    PRIMARY KEY (result_id, number)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS breaks_by_reason ON breaks (reason_id, result_id);
+CREATE INDEX IF NOT EXISTS breaks_by_stack ON breaks (stack_id, result_id);
+CREATE VIEW IF NOT EXISTS break_reasons AS
+    SELECT b.result_id, b.number, s.text AS reason FROM breaks b JOIN strings s ON s.id = b.reason_id;
+CREATE TABLE IF NOT EXISTS runtime_stats (
+    result_id INTEGER NOT NULL REFERENCES results (id),
+    variant TEXT NOT NULL,
+    p50 REAL,
+    p90 REAL,
+    p99 REAL,
+    mean REAL,
+    throughput REAL,
+    peak_memory_bytes INTEGER,
+    speedup REAL,
+    PRIMARY KEY (result_id, variant)
+);
+CREATE TABLE IF NOT EXISTS compile_phases (
+    result_id INTEGER NOT NULL REFERENCES results (id),
+    phase TEXT NOT NULL,
+    seconds REAL NOT NULL,
+    source TEXT,
+    PRIMARY KEY (result_id, phase)
+);
+CREATE TABLE IF NOT EXISTS graph_compile_times (
+    result_id INTEGER NOT NULL REFERENCES results (id),
+    idx INTEGER NOT NULL,
+    seconds REAL NOT NULL,
+    PRIMARY KEY (result_id, idx)
+);
+CREATE TABLE IF NOT EXISTS reason_index (
+    normalized TEXT NOT NULL,
+    reason_id INTEGER NOT NULL REFERENCES strings (id)
+);
+CREATE INDEX IF NOT EXISTS reason_index_by_normalized ON reason_index (normalized, reason_id);
+CREATE TABLE IF NOT EXISTS frame_index (
+    frame TEXT NOT NULL,
+    stack_id INTEGER NOT NULL REFERENCES strings (id),
+    depth INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS frame_index_by_frame_stack ON frame_index (frame, stack_id);
+CREATE TABLE IF NOT EXISTS blobs (
+    result_id INTEGER NOT NULL REFERENCES results (id),
+    kind TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    data BLOB NOT NULL,
+    PRIMARY KEY (result_id, kind, idx)
+);
+"""
+
+# Keys of DynamoExplainData.additional_data that get their own blob kind
+OPS_PER_GRAPH = "ops_per_graph"
+OUT_GUARDS = "out_guards"
+RUNTIME_FIELDS = ("p50", "p90", "p99", "mean", "throughput", "peak_memory_bytes")
+SUMMARY_COLUMNS = ("id, model_family, model_name, model_commit, torch_version, created_at,"
+                   " graph_count, graph_break_count, op_count, compile_time, build")
+
+
+@dataclass
+class ResultSummary:
+    id: int
+    model_family: str
+    model_name: str
+    model_commit: Optional[str]
+    torch_version: Optional[str]
+    created_at: float
+    graph_count: int
+    graph_break_count: int
+    op_count: int
+    compile_time: Optional[float]
+    build: Optional[str] = None
+
+
+def _pack(value) -> bytes:
+    return zlib.compress(json.dumps(value).encode())
+
+
+def _unpack(data: bytes):
+    return json.loads(zlib.decompress(data))
+
+
+class ResultStore:
+    def __init__(self, path: str = DEFAULT_STORE_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        # Explain workers append concurrently; wait for the write lock instead of failing
+        self._conn = sqlite3.connect(path, timeout=120)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+
+    def close(self):
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def append(self, model_family: str, model_name: str, data: DynamoExplainData,
+               model_commit: Optional[str] = None, torch_version: Optional[str] = None,
+               created_at: Optional[float] = None, source: Optional[str] = None,
+               build: Optional[str] = None) -> int:
+        """Add one explain result and return its id.
+
+        `build` is the CI build that produced the result (Jenkins' BUILD_NUMBER),
+        so results of the same model can be told apart across nightly runs.
+        """
+        additional = dict(data.additional_data or {})
+        ops_per_graph = additional.pop(OPS_PER_GRAPH, None)
+        out_guards = additional.pop(OUT_GUARDS, None)
+        runtime = additional.pop(RUNTIME, None)
+        phases = additional.pop(COMPILE_PHASES, None)
+        model_commit = model_commit or additional.get("model_commit")
+        compile_time = data.compile_times.total_time if data.compile_times else None
+
+        with self._conn:
+            cur = self._conn.execute(
+                "INSERT INTO results (model_family, model_name, model_commit, torch_version,"
+                " created_at, source, graph_count, graph_break_count, op_count, compile_time, build)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (model_family, model_name, model_commit, torch_version,
+                 created_at if created_at is not None else time.time(), source,
+                 data.graph_count, data.graph_break_count, data.op_count, compile_time, build),
+            )
+            result_id = cur.lastrowid
+            self._add_breaks(result_id, [
+                (br.number, br.reason, json.dumps(br.user_stack) if br.user_stack is not None else None)
+                for br in data.break_reasons
+            ])
+
+            if runtime is not None:
+                self._conn.executemany(
+                    "INSERT INTO runtime_stats (result_id, variant, p50, p90, p99, mean, throughput,"
+                    " peak_memory_bytes, speedup) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    [(result_id, variant, *(runtime[variant].get(field) for field in RUNTIME_FIELDS),
+                      runtime.get("speedup"))
+                     for variant in ("eager", "compiled") if variant in runtime],
+                )
+            if phases is not None:
+                self._conn.executemany(
+                    "INSERT INTO compile_phases (result_id, phase, seconds, source) VALUES (?, ?, ?, ?)",
+                    [(result_id, phase, seconds, phases.get("source"))
+                     for phase, seconds in phases.get("phases", {}).items()],
+                )
+                self._conn.executemany(
+                    "INSERT INTO graph_compile_times (result_id, idx, seconds) VALUES (?, ?, ?)",
+                    [(result_id, idx, seconds)
+                     for idx, seconds in enumerate(phases.get("per_graph", []))],
+                )
+
+            # Payloads are packed one at a time so lazily rendered graphs never
+            # need to be held in memory together
+            blobs = []
+            if out_guards is not None:
+                blobs.append(("guards", 0, out_guards))
+            if data.compile_times:
+                blobs.append(("compile_time_details", 0, data.compile_times.details))
+            if additional:
+                blobs.append(("additional_data", 0, additional))
+            payloads = itertools.chain(
+                blobs,
+                (("graph", i, graph) for i, graph in enumerate(data.graphs or [])),
+                (("ops", i, ops) for i, ops in enumerate(ops_per_graph or [])),
+            )
+            self._conn.executemany(
+                "INSERT INTO blobs (result_id, kind, idx, data) VALUES (?, ?, ?, ?)",
+                ((result_id, kind, idx, _pack(value)) for kind, idx, value in payloads),
+            )
+        return result_id
+
+    def summaries(self, latest_only: bool = True, per_torch_version: bool = False) -> List[ResultSummary]:
+        """Summary rows, by default only the newest result of every model (or of every
+        model and torch version, with per_torch_version=True)."""
+        query = f"SELECT {SUMMARY_COLUMNS} FROM results"
+        if latest_only:
+            group = "model_family, model_name, torch_version" if per_torch_version else "model_family, model_name"
+            query += f" WHERE id IN (SELECT MAX(id) FROM results GROUP BY {group})"
+        query += " ORDER BY id"
+        return [ResultSummary(*row) for row in self._conn.execute(query)]
+
+    def history(self, model_name: str, model_family: Optional[str] = None) -> List[ResultSummary]:
+        """Summary rows of every result of one model, oldest first."""
+        query = f"SELECT {SUMMARY_COLUMNS} FROM results WHERE model_name = ?"
+        params: tuple = (model_name,)
+        if model_family is not None:
+            query += " AND model_family = ?"
+            params += (model_family,)
+        return [ResultSummary(*row) for row in self._conn.execute(query + " ORDER BY created_at, id", params)]
+
+    def iter_latest_ids(self, since: Optional[float] = None) -> Iterable[int]:
+        """Stream the id of the newest result of every model, optionally only those created after `since`."""
+        query = "SELECT MAX(id) FROM results"
+        params = ()
+        if since is not None:
+            query += " WHERE created_at > ?"
+            params = (since,)
+        query += " GROUP BY model_family, model_name ORDER BY MAX(id)"
+        for (result_id,) in self._conn.execute(query, params):
+            yield result_id
+
+    def summary(self, result_id: int) -> ResultSummary:
+        row = self._conn.execute(
+            f"SELECT {SUMMARY_COLUMNS} FROM results WHERE id = ?", (result_id,)
+        ).fetchone()
+        if row is None:
+            raise KeyError(f"No result with id {result_id}")
+        return ResultSummary(*row)
+
+    def break_reasons(self, result_id: int) -> List[Tuple[int, str]]:
+        return self._conn.execute(
+            "SELECT number, reason FROM break_reasons WHERE result_id = ? ORDER BY number",
+            (result_id,),
+        ).fetchall()
+
+    def user_stacks(self, result_id: int) -> List[Optional[list]]:
+        """User stack of every break reason of a result, in break number order."""
+        rows = self._conn.execute(
+            "SELECT s.text FROM breaks b LEFT JOIN strings s ON s.id = b.stack_id"
+            " WHERE b.result_id = ? ORDER BY b.number",
+            (result_id,),
+        )
+        return [json.loads(text) if text is not None else None for (text,) in rows]
+
+    def runtime(self, result_id: int) -> Optional[dict]:
+        """Runtime stats of a result in the runtime_profile.measure_runtime format, if measured."""
+        rows = self._conn.execute(
+            "SELECT variant, p50, p90, p99, mean, throughput, peak_memory_bytes, speedup"
+            " FROM runtime_stats WHERE result_id = ?",
+            (result_id,),
+        ).fetchall()
+        if not rows:
+            return None
+        runtime = {"speedup": rows[0][-1]}
+        for variant, *values, _ in rows:
+            runtime[variant] = dict(zip(RUNTIME_FIELDS, values))
+        return runtime
+
+    def compile_phases(self, result_id: int) -> Optional[dict]:
+        """Per-phase compile timings of a result in the compile_phases.py format, if recorded."""
+        rows = self._conn.execute(
+            "SELECT phase, seconds, source FROM compile_phases WHERE result_id = ?", (result_id,)
+        ).fetchall()
+        if not rows:
+            return None
+        per_graph = self._conn.execute(
+            "SELECT seconds FROM graph_compile_times WHERE result_id = ? ORDER BY idx", (result_id,)
+        ).fetchall()
+        return {
+            "source": rows[0][2],
+            "phases": {phase: seconds for phase, seconds, _ in rows},
+            "per_graph": [seconds for (seconds,) in per_graph],
+        }
+
+    def _blobs(self, result_id: int, kind: str) -> List:
+        rows = self._conn.execute(
+            "SELECT data FROM blobs WHERE result_id = ? AND kind = ? ORDER BY idx",
+            (result_id, kind),
+        )
+        return [_unpack(row[0]) for row in rows]
+
+    def _lazy_blobs(self, result_id: int, kind: str) -> LazySequence:
+        count = self._conn.execute(
+            "SELECT COUNT(*) FROM blobs WHERE result_id = ? AND kind = ?", (result_id, kind)
+        ).fetchone()[0]
+
+        def load_blob(idx):
+            row = self._conn.execute(
+                "SELECT data FROM blobs WHERE result_id = ? AND kind = ? AND idx = ?",
+                (result_id, kind, idx),
+            ).fetchone()
+            return _unpack(row[0])
+
+        return LazySequence(count, load_blob)
+
+    def load(self, result_id: int, lazy: bool = True) -> DynamoExplainData:
+        """Rebuild the full DynamoExplainData of one result, including all payloads.
+
+        With lazy=True graphs and ops per graph are read from the store on access,
+        so the store must stay open while they are used.
+        """
+        payloads = self._lazy_blobs if lazy else self._blobs
+        row = self._conn.execute(
+            "SELECT graph_count, graph_break_count, op_count, compile_time FROM results WHERE id = ?",
+            (result_id,),
+        ).fetchone()
+        if row is None:
+            raise KeyError(f"No result with id {result_id}")
+        graph_count, graph_break_count, op_count, compile_time = row
+
+        stacks = self.user_stacks(result_id)
+        break_reasons = [
+            BreakReason(number, reason, stack)
+            for (number, reason), stack in zip(self.break_reasons(result_id), stacks)
+        ]
+        compile_times = None
+        if compile_time is not None:
+            details = self._blobs(result_id, "compile_time_details")
+            compile_times = CompileTime(compile_time, details[0] if details else {})
+
+        additional = self._blobs(result_id, "additional_data")
+        data = DynamoExplainData(
+            graph_count=graph_count,
+            graph_break_count=graph_break_count,
+            op_count=op_count,
+            break_reasons=break_reasons,
+            compile_times=compile_times,
+            additional_data=additional[0] if additional else {},
+            graphs=payloads(result_id, "graph"),
+        )
+        ops_per_graph = payloads(result_id, "ops")
+        if ops_per_graph:
+            data.additional_data[OPS_PER_GRAPH] = ops_per_graph
+        guards = self._blobs(result_id, "guards")
+        if guards:
+            data.additional_data[OUT_GUARDS] = guards[0]
+        runtime = self.runtime(result_id)
+        if runtime is not None:
+            data.additional_data[RUNTIME] = runtime
+        phases = self.compile_phases(result_id)
+        if phases is not None:
+            data.additional_data[COMPILE_PHASES] = phases
+        return data
+
+    def latest_compile_times(self) -> Dict[str, float]:
+        """model_name -> compile time of its newest result that recorded one."""
+        rows = self._conn.execute(
+            "SELECT model_name, compile_time FROM results WHERE id IN"
+            " (SELECT MAX(id) FROM results WHERE compile_time IS NOT NULL GROUP BY model_name)"
+        )
+        return dict(rows.fetchall())
+
+    def merge_from(self, other_path: str) -> int:
+        """Append every result of another store, with new ids. Returns the number merged."""
+        columns = ("model_family, model_name, model_commit, torch_version, created_at, source,"
+                   " graph_count, graph_break_count, op_count, compile_time, build")
+        # Creates any table an empty or partly written shard store lacks
+        ResultStore(other_path).close()
+        self._conn.execute("ATTACH DATABASE ? AS other", (other_path,))
+        try:
+            with self._conn:
+                old_ids = [row[0] for row in self._conn.execute("SELECT id FROM other.results ORDER BY id")]
+                for old_id in old_ids:
+                    cur = self._conn.execute(
+                        f"INSERT INTO results ({columns}) SELECT {columns} FROM other.results WHERE id = ?",
+                        (old_id,),
+                    )
+                    new_id = cur.lastrowid
+                    # String ids are local to a store, so breaks are re-interned here
+                    self._add_breaks(new_id, self._conn.execute(
+                        "SELECT b.number, r.text, s.text FROM other.breaks b"
+                        " JOIN other.strings r ON r.id = b.reason_id"
+                        " LEFT JOIN other.strings s ON s.id = b.stack_id"
+                        " WHERE b.result_id = ? ORDER BY b.number",
+                        (old_id,),
+                    ).fetchall())
+                    self._conn.execute(
+                        "INSERT INTO runtime_stats (result_id, variant, p50, p90, p99, mean, throughput,"
+                        " peak_memory_bytes, speedup) SELECT ?, variant, p50, p90, p99, mean, throughput,"
+                        " peak_memory_bytes, speedup FROM other.runtime_stats WHERE result_id = ?",
+                        (new_id, old_id),
+                    )
+                    self._conn.execute(
+                        "INSERT INTO compile_phases (result_id, phase, seconds, source)"
+                        " SELECT ?, phase, seconds, source FROM other.compile_phases WHERE result_id = ?",
+                        (new_id, old_id),
+                    )
+                    self._conn.execute(
+                        "INSERT INTO graph_compile_times (result_id, idx, seconds)"
+                        " SELECT ?, idx, seconds FROM other.graph_compile_times WHERE result_id = ?",
+                        (new_id, old_id),
+                    )
+                    self._conn.execute(
+                        "INSERT INTO blobs (result_id, kind, idx, data)"
+                        " SELECT ?, kind, idx, data FROM other.blobs WHERE result_id = ?",
+                        (new_id, old_id),
+                    )
+        finally:
+            self._conn.execute("DETACH DATABASE other")
+        return len(old_ids)
+
+    def content_hash(self, result_id: int) -> str:
+        """Digest of everything a result holds except its id, time and source."""
+        digest = hashlib.sha1()
+        queries = [
+            ("SELECT model_family, model_name, model_commit, torch_version, graph_count,"
+             " graph_break_count, op_count, compile_time FROM results WHERE id = ?"),
+            ("SELECT b.number, r.text, s.text FROM breaks b JOIN strings r ON r.id = b.reason_id"
+             " LEFT JOIN strings s ON s.id = b.stack_id WHERE b.result_id = ? ORDER BY b.number"),
+            ("SELECT variant, p50, p90, p99, mean, throughput, peak_memory_bytes, speedup"
+             " FROM runtime_stats WHERE result_id = ? ORDER BY variant"),
+            "SELECT phase, seconds, source FROM compile_phases WHERE result_id = ? ORDER BY phase",
+            "SELECT idx, seconds FROM graph_compile_times WHERE result_id = ? ORDER BY idx",
+        ]
+        for query in queries:
+            for row in self._conn.execute(query, (result_id,)):
+                digest.update(repr(row).encode())
+        for kind, idx, data in self._conn.execute(
+            "SELECT kind, idx, data FROM blobs WHERE result_id = ? ORDER BY kind, idx", (result_id,)
+        ):
+            digest.update(f"{kind}:{idx}:".encode())
+            digest.update(data)
+        return digest.hexdigest()
+
+    def _intern(self, text: str) -> Tuple[int, bool]:
+        """Id of a string in the strings table, and whether it was added just now."""
+        digest = hashlib.sha1(text.encode()).digest()
+        cur = self._conn.execute("INSERT OR IGNORE INTO strings (digest, text) VALUES (?, ?)", (digest, text))
+        if cur.rowcount:
+            return cur.lastrowid, True
+        return self._conn.execute("SELECT id FROM strings WHERE digest = ?", (digest,)).fetchone()[0], False
+
+    def _add_breaks(self, result_id: int, breaks: Iterable[Tuple[int, str, Optional[str]]]):
+        """Insert (number, reason, JSON user stack) rows of a result, indexing strings seen for the first time."""
+        rows = []
+        for number, reason, stack in breaks:
+            reason_id, new = self._intern(reason)
+            if new:
+                self._conn.execute("INSERT INTO reason_index (normalized, reason_id) VALUES (?, ?)",
+                                   index_reason(reason_id, reason))
+            stack_id = None
+            if stack is not None:
+                stack_id, new = self._intern(stack)
+                if new:
+                    self._conn.executemany("INSERT INTO frame_index (frame, stack_id, depth) VALUES (?, ?, ?)",
+                                           index_stack(stack_id, json.loads(stack)))
+            rows.append((result_id, number, reason_id, stack_id))
+        self._conn.executemany(
+            "INSERT INTO breaks (result_id, number, reason_id, stack_id) VALUES (?, ?, ?, ?)", rows
+        )
+
+    def _reindex_breaks(self) -> int:
+        self._conn.execute("DELETE FROM reason_index")
+        self._conn.execute("DELETE FROM frame_index")
+        reasons = self._conn.execute(
+            "SELECT id, text FROM strings WHERE id IN (SELECT reason_id FROM breaks)"
+        ).fetchall()
+        self._conn.executemany("INSERT INTO reason_index (normalized, reason_id) VALUES (?, ?)",
+                               (index_reason(reason_id, reason) for reason_id, reason in reasons))
+        stacks = self._conn.execute(
+            "SELECT id, text FROM strings WHERE id IN (SELECT stack_id FROM breaks)"
+        ).fetchall()
+        for stack_id, stack in stacks:
+            self._conn.executemany("INSERT INTO frame_index (frame, stack_id, depth) VALUES (?, ?, ?)",
+                                   index_stack(stack_id, json.loads(stack)))
+        return len(reasons) + len(stacks)
+
+    def reindex_breaks(self) -> int:
+        """Rebuild reason_index and frame_index, e.g. after the normalization rules changed.
+        Returns the number of distinct reasons and stacks indexed."""
+        with self._conn:
+            return self._reindex_breaks()
+
+    def query(self, sql: str, params: tuple = ()) -> List[tuple]:
+        """Run a read-only query against the store, e.g. over the break indexes."""
+        return self._conn.execute(sql, params).fetchall()
+
+    def has_source(self, source: str, created_at: float) -> bool:
+        row = self._conn.execute(
+            "SELECT 1 FROM results WHERE source = ? AND created_at = ? LIMIT 1", (source, created_at)
+        ).fetchone()
+        return row is not None
+
+
+def iter_pickles(input_dir: Path) -> Iterable[Tuple[str, str, Path]]:
+    """Yield (model_family, model_name, path) for every <family>/*.pkl result file."""
+    for model_family_dir in sorted(input_dir.iterdir()):
+        if model_family_dir.is_dir():
+            for pkl_file in sorted(model_family_dir.glob("*.pkl")):
+                model_name = pkl_file.stem.replace("_dynamo_explain", "").replace("--", "/")
+                yield model_family_dir.name, model_name, pkl_file
+
+
+def convert_pickles(input_dir: Path, store: ResultStore) -> int:
+    """Append every pickled DynamoExplainData under input_dir that is not yet in the store."""
+    converted = 0
+    for model_family, model_name, pkl_file in iter_pickles(input_dir):
+        mtime = pkl_file.stat().st_mtime
+        source = str(pkl_file.resolve())
+        if store.has_source(source, mtime):
+            continue
+        try:
+            with pkl_file.open("rb") as f:
+                data: DynamoExplainData = pickle.load(f)
+        except Exception as e:
+            print(f"Failed to load {pkl_file}: {e}")
+            continue
+        store.append(model_family, model_name, data, created_at=mtime, source=source)
+        converted += 1
+    return converted
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the dynamo explain result store.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    convert = subparsers.add_parser("convert", help="Import existing .pkl results into the store")
+    convert.add_argument('--input-dir', default=os.path.dirname(DEFAULT_STORE_PATH),
+                         help='Directory containing <family>/*.pkl results')
+    convert.add_argument('--store', default=DEFAULT_STORE_PATH,
+                         help='Path of the result store')
+    merge = subparsers.add_parser("merge", help="Append the results of other stores to this one")
+    merge.add_argument('sources', nargs='+',
+                       help='Stores to merge in')
+    merge.add_argument('--store', default=DEFAULT_STORE_PATH,
+                       help='Path of the result store')
+    args = parser.parse_args()
+
+    if args.command == "convert":
+        with ResultStore(args.store) as store:
+            converted = convert_pickles(Path(args.input_dir), store)
+        print(f"[+] Converted {converted} result file(s) into {args.store}")
+    elif args.command == "merge":
+        with ResultStore(args.store) as store:
+            for source in args.sources:
+                merged = store.merge_from(source)
+                print(f"[+] Merged {merged} result(s) from {source}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""
+runtime_profile.py
+
+Times eager execution against torch.compile on the same inputs, so graph breaks
+can be weighed by how much inference speed compiling would actually buy.
+
+measure_runtime returns a dict that is stored as additional_data["runtime"] on
+DynamoExplainData:
+
+  {"eager":    {"p50": s, "p90": s, "p99": s, "mean": s, "throughput": calls/s, "peak_memory_bytes": n},
+   "compiled": {... same keys ...},
+   "speedup":  eager p50 / compiled p50}
+
+Peak memory is the CUDA allocator peak when the model runs on a GPU. On CPU it
+is the process peak RSS (VmHWM), which is reset before each variant.
+"""
+
+import math
+import time
+import resource
+from typing import Callable, Dict, List
+
+RUNTIME_KEY = "runtime"
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    rank = max(1, math.ceil(q / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def _reset_peak_rss():
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+def _peak_rss_bytes() -> int:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def measure_variant(fn: Callable, inputs: dict, iterations: int, warmup: int) -> Dict[str, float]:
+    import torch
+
+    on_cuda = any(isinstance(v, torch.Tensor) and v.is_cuda for v in inputs.values())
+    if on_cuda:
+        torch.cuda.reset_peak_memory_stats()
+    else:
+        _reset_peak_rss()
+
+    with torch.no_grad():
+        for _ in range(warmup):
+            fn(**inputs)
+        latencies = []
+        for _ in range(iterations):
+            if on_cuda:
+                torch.cuda.synchronize()
+            start = time.perf_counter()
+            fn(**inputs)
+            if on_cuda:
+                torch.cuda.synchronize()
+            latencies.append(time.perf_counter() - start)
+
+    latencies.sort()
+    mean = sum(latencies) / len(latencies)
+    return {
+        "p50": percentile(latencies, 50),
+        "p90": percentile(latencies, 90),
+        "p99": percentile(latencies, 99),
+        "mean": mean,
+        "throughput": 1.0 / mean if mean > 0 else 0.0,
+        "peak_memory_bytes": torch.cuda.max_memory_allocated() if on_cuda else _peak_rss_bytes(),
+    }
+
+
+def measure_runtime(model, inputs: dict, iterations: int = 20, warmup: int = 3) -> dict:
+    """Eager vs torch.compile latency, throughput and peak memory on the same inputs."""
+    import torch
+    import torch._dynamo as dynamo
+
+    eager = measure_variant(model, inputs, iterations, warmup)
+    dynamo.reset()
+    # The first warmup call of the compiled model includes compilation
+    compiled = measure_variant(torch.compile(model), inputs, iterations, max(1, warmup))
+    return {
+        "eager": eager,
+        "compiled": compiled,
+        "speedup": eager["p50"] / compiled["p50"] if compiled["p50"] > 0 else None,
+    }
@@ -0,0 +1,93 @@
+"""
+startup_benchmark.py
+
+Startup-time check for the pipeline entry points that should not need torch.
+
+Each entry point is imported in a fresh interpreter, --runs times. The run
+fails (exit code 1) when the median wall time, interpreter start included, is
+above --budget seconds or when the import pulled in any of HEAVY_MODULES. The
+second check is what usually regresses: one top-level `import torch` in a
+shared module costs seconds in every script that imports it.
+
+Usage:
+  python startup_benchmark.py [--runs 5] [--budget 1.0]
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+from typing import Dict, List, Tuple
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(SCRIPTS_DIR)
+
+# Modules that listing, collection and result reading must start without
+ENTRY_POINTS = [
+    "pull_hf_models",
+    "collect_compile_breaks",
+    "result_store",
+    "result_ingest",
+    "dynamo_explain_creator",
+    "dynamo_explain_parser",
+    "torch_matrix",
+]
+HEAVY_MODULES = ["torch", "transformers", "numpy", "umap", "numba", "pynndescent"]
+
+PROBE = """
+import sys, json
+sys.path.insert(0, {scripts!r})
+import {module}
+print(json.dumps(sorted(set({heavy!r}) & set(sys.modules))))
+"""
+
+
+def time_import(module: str) -> Tuple[float, List[str]]:
+    """Wall time of importing `module` in a fresh interpreter, and the heavy modules it loaded."""
+    code = PROBE.format(scripts=SCRIPTS_DIR, module=module, heavy=HEAVY_MODULES)
+    start = time.perf_counter()
+    # collect_compile_breaks resolves its output paths relative to the repo root
+    out = subprocess.run([sys.executable, "-c", code], cwd=REPO_ROOT, check=True,
+                         capture_output=True, text=True).stdout
+    elapsed = time.perf_counter() - start
+    return elapsed, json.loads(out.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the startup time of the pipeline entry points.")
+    parser.add_argument('--runs', type=int, default=5,
+                        help='Fresh interpreters per entry point')
+    parser.add_argument('--budget', type=float, default=1.0,
+                        help='Maximum median startup time in seconds')
+    args = parser.parse_args()
+
+    failures = []
+    results: Dict[str, float] = {}
+    for module in ENTRY_POINTS:
+        try:
+            samples = [time_import(module) for _ in range(args.runs)]
+        except subprocess.CalledProcessError as e:
+            failures.append(f"{module}: import failed\n{e.stderr}")
+            continue
+        median = statistics.median(seconds for seconds, _ in samples)
+        heavy = samples[-1][1]
+        results[module] = median
+        print(f"    {module:24s} {median * 1000:7.0f} ms" + (f"  loads {', '.join(heavy)}" if heavy else ""))
+        if heavy:
+            failures.append(f"{module} imports {', '.join(heavy)} at startup")
+        if median > args.budget:
+            failures.append(f"{module} takes {median:.2f}s to start (budget {args.budget:.2f}s)")
+
+    if failures:
+        print("[!] Startup regressions:")
+        for line in failures:
+            print(f"    {line}")
+        sys.exit(1)
+    print("[+] All entry points start within budget")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,333 @@
+"""
+torch_matrix.py
+
+Runs the explain stage against several torch versions, each in its own cached
+virtualenv.
+
+Versions are given as:
+  2.6.0      a release, installed from the wheel cache if it holds a matching
+             wheel for this interpreter, else from PyPI
+  nightly    the newest nightly (dev) torch wheel in the wheel cache
+  PATH.whl   a specific torch wheel
+
+Every version gets a virtualenv under --env-dir with everything in
+requirements.txt plus the requested torch. Pins on torch itself and on the
+packages torch pins for each release (sympy, networkx, ...) are dropped, so
+pip picks the versions the requested torch needs. Packages that pin an exact
+torch release themselves (torchvision, and timm through it) would drag in or
+reject the requested torch, so they are installed afterwards with --no-deps:
+torchvision as the release built against a torch release, or the newest one
+for nightly and local builds. A version that fails to
+install is skipped and the rest of the matrix still runs. The environment is
+kept and reused until requirements.txt, the torch wheel or the Python version
+change, so after the first run setting up a version takes a second instead of
+minutes.
+
+dynamo_explain_creator.py then runs in every environment, appending to
+dynamo_explain_output/torch_matrix.sqlite with its own incremental state file
+per version. Results carry torch.__version__ as their torch version, so the
+history tools work on them with --store (see break_history.py), and
+collect_compile_breaks.py exports the newest break count and compile time of
+every model per torch version.
+
+Usage:
+  python torch_matrix.py --versions 2.5.1,2.6.0,2.7.0,nightly [--wheel-dir DIR] [--env-dir DIR]
+                         [--rebuild] [CREATOR_ARGS ...]
+  python torch_matrix.py --list
+
+Arguments that torch_matrix.py does not know (e.g. --workers 4 --screen
+--incremental) are passed on to dynamo_explain_creator.py.
+"""
+
+import os
+import re
+import sys
+import glob
+import json
+import time
+import shutil
+import hashlib
+import argparse
+import subprocess
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(SCRIPTS_DIR)
+REQUIREMENTS_FILE = os.path.join(REPO_ROOT, "requirements.txt")
+
+ENV_DIR = os.getenv("TORCH_ENV_DIR", os.path.expanduser("~/.cache/torch_envs"))
+WHEEL_DIR = os.getenv("TORCH_WHEEL_DIR", os.path.expanduser("~/.cache/torch_wheels"))
+ENV_MARKER = ".torch_matrix.json"
+MATRIX_STATE_PATTERN = "last_model_commits.torch-{}.json"
+
+_REQUIREMENT_NAME = re.compile(r"^([A-Za-z0-9][A-Za-z0-9._-]*)")
+# torch pins its own versions of these; the repo pins only fit the torch in requirements.txt
+TORCH_DEPENDENCIES = {"sympy", "mpmath", "networkx", "filelock", "fsspec", "jinja2", "markupsafe",
+                      "typing-extensions"}
+# These pin an exact torch release (timm through torchvision), so they go in with --no-deps
+TORCH_PINNED = {"torchvision", "torchaudio", "timm"}
+# torch 2.x.y is built together with torchvision 0.(x + 15).y and torchaudio 2.x.y
+TORCHVISION_MINOR_OFFSET = 15
+
+
+@dataclass
+class TorchSpec:
+    name: str            # environment name, e.g. 2.6.0 or 2.9.0.dev20250801+cpu
+    install: List[str]   # pip install arguments that install this torch
+
+
+def cached_wheels(wheel_dir: str) -> List[Tuple[object, str]]:
+    """(version, path) of every torch wheel in wheel_dir that this interpreter can install."""
+    from packaging.tags import sys_tags
+    from packaging.utils import InvalidWheelFilename, parse_wheel_filename
+
+    supported = set(sys_tags())
+    wheels = []
+    for path in glob.glob(os.path.join(wheel_dir, "torch-*.whl")):
+        try:
+            _, version, _, tags = parse_wheel_filename(os.path.basename(path))
+        except InvalidWheelFilename:
+            continue
+        if tags & supported:
+            wheels.append((version, path))
+    return sorted(wheels)
+
+
+def resolve_spec(spec: str, wheel_dir: str = WHEEL_DIR) -> TorchSpec:
+    """Turn a version, 'nightly' or a wheel path into what pip needs to install it."""
+    if spec.endswith(".whl"):
+        from packaging.utils import parse_wheel_filename
+
+        path = os.path.abspath(spec)
+        return TorchSpec(str(parse_wheel_filename(os.path.basename(path))[1]), [path])
+
+    wheels = cached_wheels(wheel_dir)
+    if spec == "nightly":
+        nightlies = [(version, path) for version, path in wheels if version.is_devrelease]
+        if not nightlies:
+            raise ValueError(f"No nightly torch wheel for this Python in {wheel_dir}")
+        version, path = nightlies[-1]
+        return TorchSpec(str(version), [path])
+
+    for version, path in reversed(wheels):
+        if spec in (str(version), version.public):
+            return TorchSpec(spec, [path])
+    return TorchSpec(spec, [f"torch=={spec}"])
+
+
+def _read_requirements(path: str) -> List[Tuple[str, str]]:
+    """(canonical name, line) of every requirement in a requirements file."""
+    from packaging.utils import canonicalize_name
+
+    requirements = []
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            match = _REQUIREMENT_NAME.match(line)
+            if match is not None:
+                requirements.append((canonicalize_name(match.group(1)), line))
+    return requirements
+
+
+def base_requirements(path: str = REQUIREMENTS_FILE) -> List[str]:
+    """requirements.txt without torch and TORCH_PINNED, and with torch's own dependencies unpinned."""
+    requirements = []
+    for name, line in _read_requirements(path):
+        if name == "torch" or name in TORCH_PINNED:
+            continue
+        if name in TORCH_DEPENDENCIES:
+            line = name
+        if line not in requirements:
+            requirements.append(line)
+    return requirements
+
+
+def companion_requirements(torch_version: str, path: str = REQUIREMENTS_FILE) -> List[str]:
+    """The TORCH_PINNED packages of requirements.txt (and the torchvision timm needs),
+    to install with --no-deps next to torch_version."""
+    from packaging.version import InvalidVersion, Version
+
+    names = {name: line for name, line in _read_requirements(path) if name in TORCH_PINNED}
+    if "timm" in names:
+        names.setdefault("torchvision", "torchvision")
+    try:
+        version = Version(torch_version)
+    except InvalidVersion:
+        version = None
+    release = version is not None and not version.is_devrelease and not version.is_prerelease
+    if release and version.major == 2:
+        # A release gets the builds made for it; nightly and local builds the newest ones
+        minor, micro = version.minor, version.micro
+        if "torchvision" in names:
+            names["torchvision"] = f"torchvision==0.{minor + TORCHVISION_MINOR_OFFSET}.{micro}"
+        if "torchaudio" in names:
+            names["torchaudio"] = f"torchaudio==2.{minor}.{micro}"
+    return [names[name] for name in sorted(names)]
+
+
+def env_fingerprint(spec: TorchSpec, requirements: List[str]) -> str:
+    """Digest of everything an environment is built from; a change means a rebuild."""
+    digest = hashlib.sha1()
+    digest.update(sys.version.encode())
+    digest.update("\n".join(requirements).encode())
+    for arg in spec.install:
+        digest.update(arg.encode())
+        if os.path.isfile(arg):
+            # Wheels are large; a replaced wheel changes size or mtime
+            stat = os.stat(arg)
+            digest.update(f"{stat.st_size}:{stat.st_mtime_ns}".encode())
+    return digest.hexdigest()
+
+
+def read_marker(env: str) -> Optional[dict]:
+    marker = os.path.join(env, ENV_MARKER)
+    if not os.path.exists(marker):
+        return None
+    with open(marker) as f:
+        return json.load(f)
+
+
+def ensure_env(spec: TorchSpec, env_dir: str = ENV_DIR, wheel_dir: str = WHEEL_DIR,
+               rebuild: bool = False) -> str:
+    """Path of the Python interpreter of the environment for spec, building it if needed."""
+    env = os.path.join(env_dir, spec.name)
+    python = os.path.join(env, "bin", "python")
+    requirements = base_requirements()
+    companions = companion_requirements(spec.name)
+    fingerprint = env_fingerprint(spec, requirements + companions)
+
+    marker = read_marker(env)
+    if not rebuild and marker is not None and marker.get("fingerprint") == fingerprint:
+        print(f"[*] Reusing torch {marker['torch_version']} environment at {env}")
+        return python
+
+    # The marker is written last, so a half-built environment is rebuilt from scratch
+    print(f"[+] Building torch {spec.name} environment at {env}")
+    start = time.time()
+    shutil.rmtree(env, ignore_errors=True)
+    try:
+        subprocess.run([sys.executable, "-m", "venv", env], check=True)
+        requirements_path = os.path.join(env, "requirements.txt")
+        with open(requirements_path, "w") as f:
+            f.write("\n".join(requirements) + "\n")
+        find_links = ["--find-links", wheel_dir] if os.path.isdir(wheel_dir) else []
+        # One pip call, so torch and everything that depends on it resolve together
+        subprocess.run([python, "-m", "pip", "install", "--disable-pip-version-check", "-q",
+                        *find_links, "-r", requirements_path, *spec.install], check=True)
+        if companions:
+            subprocess.run([python, "-m", "pip", "install", "--disable-pip-version-check", "-q",
+                            "--no-deps", *find_links, *companions], check=True)
+        torch_version = subprocess.run(
+            [python, "-c", "import torch; print(torch.__version__)"],
+            check=True, capture_output=True, text=True,
+        ).stdout.strip()
+    except subprocess.CalledProcessError:
+        shutil.rmtree(env, ignore_errors=True)
+        raise
+
+    with open(os.path.join(env, ENV_MARKER), "w") as f:
+        json.dump({"fingerprint": fingerprint, "torch_version": torch_version,
+                   "install": spec.install, "created_at": time.time()}, f, indent=2)
+    print(f"[+] Built torch {torch_version} environment in {time.time() - start:.0f}s")
+    return python
+
+
+def run_explain(python: str, spec: TorchSpec, creator_args: List[str]) -> int:
+    """Run dynamo_explain_creator.py under one environment; returns its exit code."""
+    from result_store import TORCH_MATRIX_STORE_PATH
+
+    state = MATRIX_STATE_PATTERN.format(spec.name)
+    command = [python, "dynamo_explain_creator.py", "--store", TORCH_MATRIX_STORE_PATH,
+               "--state", state, *creator_args]
+    return subprocess.run(command, cwd=SCRIPTS_DIR).returncode
+
+
+def _version_key(version: str):
+    from packaging.version import InvalidVersion, Version
+
+    try:
+        return 0, Version(version)
+    except InvalidVersion:
+        return 1, version
+
+
+def print_matrix():
+    """Break count of every model per torch version, for the models where it differs."""
+    from result_store import TORCH_MATRIX_STORE_PATH, ResultStore
+
+    if not os.path.exists(TORCH_MATRIX_STORE_PATH):
+        return
+    counts = defaultdict(dict)
+    with ResultStore(TORCH_MATRIX_STORE_PATH) as store:
+        for summary in store.summaries(latest_only=True, per_torch_version=True):
+            counts[f"{summary.model_family}/{summary.model_name}"][summary.torch_version] = summary.graph_break_count
+    torch_versions = sorted({version for row in counts.values() for version in row if version},
+                            key=_version_key)
+    changed = {model: row for model, row in counts.items() if len(set(row.values())) > 1}
+    print(f"[+] {len(counts)} model(s) across {len(torch_versions)} torch version(s), "
+          f"{len(changed)} with different break counts")
+    if changed:
+        print("    " + " ".join(f"{version:>22s}" for version in torch_versions) + "  model")
+        for model in sorted(changed):
+            row = changed[model]
+            print("    " + " ".join(f"{row.get(version, '-'):>22}" for version in torch_versions) + f"  {model}")
+
+
+def list_envs(env_dir: str = ENV_DIR):
+    for env in sorted(glob.glob(os.path.join(env_dir, "*"))):
+        marker = read_marker(env)
+        if marker is not None:
+            built = time.strftime("%Y-%m-%d", time.localtime(marker["created_at"]))
+            print(f"    {os.path.basename(env):32s} torch {marker['torch_version']:24s} built {built}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the explain stage against several torch versions.")
+    parser.add_argument('--versions', default=os.getenv("TORCH_MATRIX_VERSIONS", ""),
+                        help="Comma-separated torch versions, 'nightly' or wheel paths "
+                             "(default: $TORCH_MATRIX_VERSIONS)")
+    parser.add_argument('--wheel-dir', default=WHEEL_DIR,
+                        help='Local torch wheel cache, e.g. of nightly builds (default: $TORCH_WHEEL_DIR)')
+    parser.add_argument('--env-dir', default=ENV_DIR,
+                        help='Where the per-version virtualenvs are kept (default: $TORCH_ENV_DIR)')
+    parser.add_argument('--rebuild', action='store_true',
+                        help='Rebuild the environments even if they are up to date')
+    parser.add_argument('--list', action='store_true',
+                        help='List the cached environments and exit')
+    args, creator_args = parser.parse_known_args()
+    if creator_args[:1] == ["--"]:
+        creator_args = creator_args[1:]
+
+    if args.list:
+        list_envs(args.env_dir)
+        return
+    specs = [spec.strip() for spec in args.versions.split(",") if spec.strip()]
+    if not specs:
+        parser.error("no torch versions given (--versions or TORCH_MATRIX_VERSIONS)")
+
+    skipped, failed = [], []
+    for spec in specs:
+        try:
+            torch_spec = resolve_spec(spec, args.wheel_dir)
+            python = ensure_env(torch_spec, args.env_dir, args.wheel_dir, args.rebuild)
+        except (ValueError, subprocess.CalledProcessError) as e:
+            # e.g. a release that has no wheel for this Python; the other versions still run
+            print(f"[!] Skipping torch {spec}, could not set up its environment: {e}")
+            skipped.append(spec)
+            continue
+        print(f"[+] Explaining models with torch {torch_spec.name}")
+        if run_explain(python, torch_spec, creator_args) != 0:
+            failed.append(spec)
+
+    print_matrix()
+    if skipped:
+        print(f"[!] {len(skipped)} torch version(s) skipped: {', '.join(skipped)}")
+    if failed:
+        print(f"[!] {len(failed)} torch version(s) did not complete: {', '.join(failed)}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""
+Run selection, diffs and first-seen lookups of break_history.py.
+"""
+
+import pytest
+
+from break_history import diff, first_seen, resolve
+from dynamo_explain_data import BreakReason, DynamoExplainData
+from result_store import ResultStore
+
+FRAME = 'File "/venv/lib/site-packages/transformers/models/bert/modeling_bert.py", line {}, in forward'
+
+
+def make_data(*breaks):
+    """breaks are reasons or (reason, stack line) pairs."""
+    break_reasons = []
+    for i, entry in enumerate(breaks):
+        reason, line = entry if isinstance(entry, tuple) else (entry, None)
+        break_reasons.append(BreakReason(i + 1, reason, [FRAME.format(line)] if line is not None else None))
+    return DynamoExplainData(graph_count=len(breaks) + 1, graph_break_count=len(breaks), op_count=1,
+                             break_reasons=break_reasons)
+
+
+@pytest.fixture
+def store(tmp_path):
+    with ResultStore(str(tmp_path / "results.sqlite")) as store:
+        yield store
+
+
+def test_resolve_selectors(store):
+    first = store.append("text", "m", make_data("a"), model_commit="3f2a9c1e", torch_version="2.6.0", build="41")
+    matrix = store.append("text", "m", make_data("a"), model_commit="3f2a9c1e", torch_version="2.7.0+cpu", build="41")
+    store.append("text", "other", make_data("a"), model_commit="3f2a9c1e", torch_version="2.6.0", build="42")
+
+    assert resolve(store, "m", "build:41,torch:2.6.0").id == first
+    assert resolve(store, "m", "torch:2.7.0").id == matrix
+    assert resolve(store, "m", "commit:3f2a,torch:2.7.0+cpu").id == matrix
+    assert resolve(store, "m", f"id:{first}").id == first
+
+
+def test_resolve_errors(store):
+    store.append("text", "m", make_data("a"), model_commit="3f2a9c1e", torch_version="2.6.0", build="41")
+    store.append("text", "m", make_data("a"), model_commit="3f2a9c1e", torch_version="2.7.0", build="41")
+
+    with pytest.raises(KeyError, match="2 runs of m match build:41"):
+        resolve(store, "m", "build:41")
+    with pytest.raises(KeyError, match="No run"):
+        resolve(store, "m", "build:42")
+    with pytest.raises(KeyError, match="No run"):
+        resolve(store, "other", "build:41,torch:2.6.0")
+    # Commit prefixes are case sensitive, like the hashes
+    with pytest.raises(KeyError):
+        resolve(store, "m", "commit:3F2A,torch:2.6.0")
+    for revision in ("41", "branch:main", "build:", "build:41,"):
+        with pytest.raises(ValueError, match="Invalid selector"):
+            resolve(store, "m", revision)
+
+
+def test_diff_by_normalized_reason(store):
+    old = store.append("text", "m", make_data("call_function torch.arange size 12", "data dependent operator",
+                                              "data dependent operator"))
+    new = store.append("text", "m", make_data("call_function torch.arange size 13", "data dependent operator",
+                                              "generic context manager"))
+    added, removed = diff(store, old, new)
+    assert added == [(1, "generic context manager", None)]
+    assert removed == [(1, "data dependent operator", None)]
+    assert diff(store, old, old) == ([], [])
+
+
+def test_diff_with_stacks(store):
+    old = store.append("text", "m", make_data(("call_function torch.arange size 12", 112)))
+    new = store.append("text", "m", make_data(("call_function torch.arange size 12", 113)))
+    assert diff(store, old, new) == ([], [])
+    added, removed = diff(store, old, new, stacks=True)
+    frame = "transformers/models/bert/modeling_bert.py:{}:forward"
+    assert added == [(1, "call_function torch.arange size 12", frame.format(113))]
+    assert removed == [(1, "call_function torch.arange size 12", frame.format(112))]
+
+
+def test_first_seen_orders_by_creation_time(store):
+    # Appended out of order, like merged shards
+    store.append("text", "a", make_data("call_function torch.arange size 13"), build="42", created_at=200.0)
+    first_a = store.append("text", "a", make_data("call_function torch.arange size 12"), build="41", created_at=100.0)
+    store.append("text", "b", make_data("data dependent operator"), created_at=50.0)
+    first_b = store.append("text", "b", make_data("call_function torch.arange size 7"), created_at=150.0)
+
+    seen = first_seen(store, "call_function torch.arange size 1")
+    assert [(s.model_name, s.id) for s in seen] == [("a", first_a), ("b", first_b)]
+    assert [s.id for s in first_seen(store, "call_function torch.arange size 1", model_name="b")] == [first_b]
+    assert first_seen(store, "generic context manager") == []
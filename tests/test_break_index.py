@@ -0,0 +1,79 @@
+"""
+Frame normalization, frame patterns and queries of the break index.
+"""
+
+import pytest
+
+from break_index import _frame_pattern, models_at_frame, models_with_reason, normalize_frame, top_frames, top_reasons
+from dynamo_explain_data import BreakReason, DynamoExplainData
+from result_store import ResultStore
+
+BERT = "transformers/models/bert/modeling_bert.py"
+
+
+@pytest.mark.parametrize("frame, expected", [
+    (f"<FrameSummary file /venv/lib/python3.11/site-packages/{BERT}, line 112 in forward>", f"{BERT}:112:forward"),
+    (f'File "/usr/lib/python3/dist-packages/{BERT}", line 7, in __init__', f"{BERT}:7:__init__"),
+    (f'File &quot;/venv/lib/site-packages/{BERT}&quot;, line 3, in forward', f"{BERT}:3:forward"),
+    ("model.py:42", "model.py:42:?"),
+    ("model.py:42:forward", "model.py:42:forward"),
+    ("    x = self.dense(x)", None),
+])
+def test_normalize_frame(frame, expected):
+    assert normalize_frame(frame) == expected
+
+
+@pytest.mark.parametrize("pattern, expected", [
+    (f"{BERT}:112:forward", f"{BERT}:112:forward"),
+    (f"{BERT}:NNN", f"{BERT}:*:*"),
+    (f"{BERT}:112", f"{BERT}:112:*"),
+    (BERT, f"{BERT}:*:*"),
+    (f"{BERT}:*:forward", f"{BERT}:*:forward"),
+    ("models/[a]?.py:1:f", "models/[[]a][?].py:1:f"),
+])
+def test_frame_pattern(pattern, expected):
+    assert _frame_pattern(pattern) == expected
+
+
+def frame(line, func="forward"):
+    return f'File "/venv/lib/site-packages/{BERT}", line {line}, in {func}'
+
+
+@pytest.fixture
+def store(tmp_path):
+    with ResultStore(str(tmp_path / "results.sqlite")) as store:
+        def add(model, reasons, latest=True):
+            store.append("text", model, DynamoExplainData(
+                graph_count=len(reasons) + 1, graph_break_count=len(reasons), op_count=1,
+                break_reasons=[BreakReason(i + 1, reason, [frame(line)]) for i, (reason, line) in enumerate(reasons)],
+            ))
+        add("org/old", [("call_function torch.arange size 12", 112)])
+        add("org/old", [])
+        add("org/a", [("call_function torch.arange size 12", 112), ("call_function torch.arange size 13", 112)])
+        add("org/b", [("Call_function torch.arange size 99", 113), ("data dependent operator", 200)])
+        yield store
+
+
+def test_models_with_reason_matches_normalized(store):
+    rows = models_with_reason(store, "call_function torch.arange size 1")
+    assert rows == [("text", "org/a", 2), ("text", "org/b", 1), ("text", "org/old", 1)]
+    assert models_with_reason(store, "call_function torch.arange size 1", latest=True) == rows[:2]
+
+
+def test_models_at_frame(store):
+    assert models_at_frame(store, f"{BERT}:112") == [("text", "org/a", 2), ("text", "org/old", 1)]
+    assert models_at_frame(store, f"{BERT}:NNN:forward", latest=True) == [("text", "org/a", 2), ("text", "org/b", 2)]
+    assert models_at_frame(store, "other.py") == []
+
+
+def test_top_frames_and_reasons(store):
+    assert top_frames(store, k=1) == [(f"{BERT}:112:forward", 2)]
+    reasons = top_reasons(store, latest=True)
+    assert reasons[0][1] == 2
+    assert len(reasons) == 2
+
+
+def test_reindex_keeps_index(store):
+    before = store.query("SELECT normalized, reason_id FROM reason_index ORDER BY 2")
+    assert store.reindex_breaks() == len(before) + store.query("SELECT COUNT(DISTINCT stack_id) FROM breaks")[0][0]
+    assert store.query("SELECT normalized, reason_id FROM reason_index ORDER BY 2") == before
@@ -0,0 +1,99 @@
+"""
+Push count of collect_compile_breaks.py against a local Pushgateway stand-in.
+
+The collector should push the whole registry once per run, or once per
+--chunk-size models plus once for the remainder, never once per model.
+"""
+
+import importlib
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from dynamo_explain_data import BreakReason, CompileTime, DynamoExplainData
+from result_store import ResultStore
+
+MODELS = 5
+
+
+class PushgatewayStub(ThreadingHTTPServer):
+    """Accepts pushes like a Pushgateway and remembers the path of every PUT."""
+
+    def __init__(self):
+        self.puts = []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_PUT(self):
+                self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                stub.puts.append(self.path)
+                self.send_response(200)
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        super().__init__(("127.0.0.1", 0), Handler)
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+@pytest.fixture
+def pushgateway():
+    server = PushgatewayStub()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def collector(tmp_path, monkeypatch):
+    """collect_compile_breaks with its store, output files and torch matrix store under tmp_path."""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("BUILD_NUMBER", "7")
+    store_path = str(tmp_path / "results.sqlite")
+    with ResultStore(store_path) as store:
+        for i in range(MODELS):
+            data = DynamoExplainData(
+                graph_count=2, graph_break_count=1, op_count=10,
+                break_reasons=[BreakReason(1, "call_function torch.arange", [])],
+                compile_times=CompileTime(0.5, {}), additional_data={},
+            )
+            store.append("text", f"org/model-{i}", data)
+
+    sys.modules.pop("collect_compile_breaks", None)
+    module = importlib.import_module("collect_compile_breaks")
+
+    class TmpResultStore(ResultStore):
+        def __init__(self, path=store_path):
+            super().__init__(path)
+
+    monkeypatch.setattr(module, "ResultStore", TmpResultStore)
+    record_torch_matrix = module.record_torch_matrix
+    monkeypatch.setattr(module, "record_torch_matrix",
+                        lambda: record_torch_matrix(str(tmp_path / "torch_matrix.sqlite")))
+    return module
+
+
+def run(collector, pushgateway, monkeypatch, *args):
+    monkeypatch.setattr(sys, "argv", ["collect_compile_breaks.py", "--pushgateway", pushgateway.url,
+                                      "--workers", "1", *args])
+    collector.main()
+    return pushgateway.puts
+
+
+def test_one_push_per_run(collector, pushgateway, monkeypatch):
+    puts = run(collector, pushgateway, monkeypatch)
+    assert puts == ["/metrics/job/compile_breaks/pipeline/7"]
+
+
+@pytest.mark.parametrize("chunk_size, pushes", [(1, 5), (2, 3), (5, 1), (10, 1)])
+def test_one_push_per_chunk(collector, pushgateway, monkeypatch, chunk_size, pushes):
+    puts = run(collector, pushgateway, monkeypatch, "--chunk-size", str(chunk_size))
+    assert len(puts) == pushes
@@ -0,0 +1,106 @@
+"""
+Corpus, fuzz and benchmark tests of DynamoExplainParser.parse_compile_times.
+
+tests/corpus/compile_times holds compile_times tables next to the expected
+parse of each: the two layouts torch prints (tabulate, and the comma-separated
+fallback without tabulate), malformed rows, and synthetic_* variants that torch
+does not print but the parser also accepts (pipe tables, values with units).
+"""
+
+import json
+import math
+import random
+import string
+import time
+from pathlib import Path
+
+import pytest
+
+from dynamo_explain_parser import MAX_COMPILE_TIME_WARNINGS, DynamoExplainParser
+
+CORPUS_DIR = Path(__file__).parent / "corpus" / "compile_times"
+CORPUS = sorted(CORPUS_DIR.glob("*.txt"))
+
+FUZZ_CASES = 2000
+FUZZ_ALPHABET = string.ascii_letters + string.digits + " \t\n,|.:-+µ"
+# Rows x values per row of the benchmark table, and its time budget on a CI agent
+BENCHMARK_SHAPE = (2000, 50)
+BENCHMARK_BUDGET_SECONDS = 2.0
+
+
+def parse(text):
+    return DynamoExplainParser.parse_compile_times(text)
+
+
+@pytest.mark.parametrize("path", CORPUS, ids=lambda path: path.stem)
+def test_corpus(path):
+    expected = json.loads(path.with_suffix(".json").read_text())
+    compile_time, warnings = parse(path.read_text())
+    assert compile_time.total_time == pytest.approx(expected["total_time"])
+    assert compile_time.details.keys() == expected["details"].keys()
+    for name, runtimes in expected["details"].items():
+        assert compile_time.details[name] == pytest.approx(runtimes)
+    assert len(warnings) == expected["warnings"]
+
+
+def test_not_a_table():
+    compile_time, warnings = parse(None)
+    assert compile_time.total_time == 0.0
+    assert compile_time.details == {}
+    assert len(warnings) == 1
+
+
+def test_rows_without_runtimes_are_warnings():
+    compile_time, warnings = parse("???\nOutputGraph.call_user_compiler  fast, slow")
+    assert compile_time.details == {}
+    assert warnings == ["line 1: unrecognized row '???'",
+                        "line 2: unrecognized row 'OutputGraph.call_user_compiler  fast, slow'"]
+
+
+def test_warnings_are_capped():
+    text = "\n".join(f"f{i}  bad{i}" for i in range(MAX_COMPILE_TIME_WARNINGS * 2))
+    _, warnings = parse(text)
+    assert len(warnings) == MAX_COMPILE_TIME_WARNINGS + 1
+
+
+def _mutate(rnd, text):
+    chars = list(text)
+    for _ in range(rnd.randint(1, 8)):
+        position = rnd.randint(0, len(chars))
+        operation = rnd.random()
+        if operation < 0.4:
+            chars[position:position] = rnd.choices(FUZZ_ALPHABET, k=rnd.randint(1, 6))
+        elif operation < 0.7:
+            del chars[position:position + rnd.randint(1, 6)]
+        else:
+            # Duplicate a slice, e.g. a whole row or part of a value
+            chars[position:position] = chars[position:position + rnd.randint(1, 40)]
+    return "".join(chars)
+
+
+def test_fuzz():
+    rnd = random.Random(0)
+    seeds = [path.read_text() for path in CORPUS]
+    for _ in range(FUZZ_CASES):
+        text = _mutate(rnd, rnd.choice(seeds))
+        compile_time, warnings = parse(text)
+        assert len(warnings) <= MAX_COMPILE_TIME_WARNINGS + 1
+        runtimes = [seconds for values in compile_time.details.values() for seconds in values]
+        assert all(isinstance(seconds, float) for seconds in runtimes)
+        if all(math.isfinite(seconds) for seconds in runtimes):
+            assert compile_time.total_time == pytest.approx(math.fsum(runtimes))
+
+
+def test_benchmark():
+    rows, values = BENCHMARK_SHAPE
+    text = "\n".join(
+        ["TorchDynamo compilation metrics:", "Function  Runtimes (s)", "--------  ------------"]
+        + [f"fn_{row}  " + ", ".join(f"{(row * values + i) % 997 / 1000:.4f}" for i in range(values))
+           for row in range(rows)]
+    )
+    start = time.perf_counter()
+    compile_time, warnings = parse(text)
+    seconds = time.perf_counter() - start
+    assert len(compile_time.details) == rows
+    assert not warnings
+    assert seconds < BENCHMARK_BUDGET_SECONDS
@@ -0,0 +1,133 @@
+"""
+Retries, Retry-After and rate limiting of HubClient against a local Hub stand-in.
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+import hf_hub_client
+from hf_hub_client import HubClient, RateLimiter
+
+
+class HubStub(ThreadingHTTPServer):
+    """Answers GETs with scripted (status, headers) responses; the last one repeats."""
+
+    def __init__(self):
+        self.responses = [(200, {})]
+        self.paths = []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stub.paths.append(self.path)
+                status, headers = stub.responses.pop(0) if len(stub.responses) > 1 else stub.responses[0]
+                body = json.dumps([{"id": "org/model"}] if status == 200 else {"error": status}).encode()
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        super().__init__(("127.0.0.1", 0), Handler)
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+@pytest.fixture
+def hub():
+    server = HubStub()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """Delays the client sleeps for, without sleeping."""
+    delays = []
+    monkeypatch.setattr(hf_hub_client.time, "sleep", delays.append)
+    return delays
+
+
+def client(url, **kwargs):
+    return HubClient(endpoint=url, token="", **{"max_retries": 3, "backoff": 0.5, "rate": 1000, **kwargs})
+
+
+def test_retries_transient_statuses(hub, sleeps):
+    hub.responses = [(503, {}), (502, {}), (200, {})]
+    assert client(hub.url).list_models("image-classification", limit=5) == [{"id": "org/model"}]
+    assert len(hub.paths) == 3
+    # Exponential backoff with jitter: backoff * 2**attempt * [1, 2)
+    assert 0.5 <= sleeps[0] < 1.0 and 1.0 <= sleeps[1] < 2.0
+
+
+def test_retry_after_is_honoured(hub, sleeps):
+    hub.responses = [(429, {"Retry-After": "7"}), (200, {})]
+    client(hub.url).get("/api/models")
+    assert sleeps == [7.0]
+    assert len(hub.paths) == 2
+
+
+def test_gives_up_after_max_retries(hub, sleeps):
+    hub.responses = [(500, {})]
+    with pytest.raises(requests.HTTPError):
+        client(hub.url, max_retries=2).get("/api/models")
+    assert len(hub.paths) == 3
+    assert len(sleeps) == 2
+
+
+def test_client_errors_are_not_retried(hub, sleeps):
+    hub.responses = [(404, {})]
+    with pytest.raises(requests.HTTPError):
+        client(hub.url).get("/api/models/missing")
+    assert len(hub.paths) == 1
+    assert sleeps == []
+
+
+def test_connection_errors_are_retried(hub, sleeps):
+    url = hub.url
+    hub.shutdown()
+    hub.server_close()
+    with pytest.raises(requests.ConnectionError):
+        client(url, max_retries=2, timeout=1).get("/api/models")
+    assert len(sleeps) == 2
+
+
+def test_rate_limiter_throttles_after_burst():
+    limiter = RateLimiter(rate=50, burst=5)
+    start = time.monotonic()
+    for _ in range(15):
+        limiter.acquire()
+    # The burst goes through at once, the other 10 at 50 per second
+    assert time.monotonic() - start >= 10 / 50 * 0.9
+
+
+def test_client_requests_are_rate_limited(hub):
+    hub_client = client(hub.url, rate=20, burst=2)
+    start = time.monotonic()
+    for _ in range(6):
+        hub_client.get("/api/models")
+    assert time.monotonic() - start >= 4 / 20 * 0.9
+    assert len(hub.paths) == 6
+
+
+def test_default_pool_covers_every_family():
+    from pull_hf_models import model_family_dict
+
+    largest_family = max(list(model_family_dict.values()).count(family) for family in set(model_family_dict.values()))
+    hub_client = HubClient(endpoint="http://127.0.0.1:9")
+    assert min(hub_client.pool_size, hub_client.limiter.burst) >= largest_family
@@ -0,0 +1,121 @@
+"""
+Round trips, string deduplication and merging of the SQLite result store.
+"""
+
+import pytest
+
+from dynamo_explain_data import BreakReason, CompileTime, DynamoExplainData
+from result_store import ResultStore
+
+STACK = ['File "/venv/lib/python3.11/site-packages/transformers/models/bert/modeling_bert.py", line 112, in forward']
+
+
+def make_data(reasons=("call_function torch.arange size 12",), with_payloads=True):
+    data = DynamoExplainData(
+        graph_count=len(reasons) + 1,
+        graph_break_count=len(reasons),
+        op_count=10,
+        break_reasons=[BreakReason(i + 1, reason, STACK if i % 2 == 0 else None) for i, reason in enumerate(reasons)],
+        compile_times=CompileTime(1.5, {"_compile.<locals>.compile_inner": [1.0, 0.5]}),
+        additional_data={"model_commit": "3f2a9c1"},
+    )
+    if with_payloads:
+        data.graphs = ["graph 0", "graph 1"]
+        data.additional_data["ops_per_graph"] = [["add"], ["mul", "sum"]]
+        data.additional_data["out_guards"] = ["guard"]
+        data.additional_data["runtime"] = {
+            "eager": {"p50": 2.0, "p90": 2.5, "p99": 3.0, "mean": 2.1, "throughput": 10.0, "peak_memory_bytes": 100},
+            "compiled": {"p50": 1.0, "p90": 1.5, "p99": 2.0, "mean": 1.1, "throughput": 20.0, "peak_memory_bytes": 90},
+            "speedup": 2.0,
+        }
+        data.additional_data["compile_phases"] = {
+            "source": "explain", "phases": {"dynamo_tracing": 0.7}, "per_graph": [0.4, 0.3],
+        }
+    return data
+
+
+@pytest.fixture
+def store(tmp_path):
+    with ResultStore(str(tmp_path / "results.sqlite")) as store:
+        yield store
+
+
+@pytest.mark.parametrize("lazy", [True, False])
+def test_append_load_round_trip(store, lazy):
+    data = make_data(("call_function torch.arange size 12", "data dependent operator"))
+    result_id = store.append("text", "org/model", data, torch_version="2.7.0", build="41")
+
+    loaded = store.load(result_id, lazy=lazy)
+    assert loaded.graph_count == data.graph_count
+    assert loaded.graph_break_count == data.graph_break_count
+    assert loaded.op_count == data.op_count
+    assert loaded.break_reasons == data.break_reasons
+    assert loaded.compile_times == data.compile_times
+    assert list(loaded.graphs) == data.graphs
+    assert list(loaded.additional_data["ops_per_graph"]) == data.additional_data["ops_per_graph"]
+    assert loaded.additional_data["out_guards"] == ["guard"]
+    assert loaded.additional_data["runtime"] == data.additional_data["runtime"]
+    assert loaded.additional_data["compile_phases"] == data.additional_data["compile_phases"]
+    assert loaded.additional_data["model_commit"] == "3f2a9c1"
+
+    summary = store.summary(result_id)
+    assert (summary.model_commit, summary.torch_version, summary.build) == ("3f2a9c1", "2.7.0", "41")
+    assert summary.compile_time == 1.5
+
+
+def test_zero_break_result(store):
+    data = DynamoExplainData(graph_count=1, graph_break_count=0, op_count=4, break_reasons=[])
+    result_id = store.append("text", "org/model", data)
+    loaded = store.load(result_id)
+    assert loaded.break_reasons == []
+    assert loaded.compile_times is None
+    assert list(loaded.graphs) == []
+
+
+def test_load_missing_result(store):
+    with pytest.raises(KeyError):
+        store.load(1)
+
+
+def test_strings_are_stored_once(store):
+    for _ in range(3):
+        store.append("text", "org/model", make_data(("call_function torch.arange size 12",), with_payloads=False))
+    assert store.query("SELECT COUNT(*) FROM strings") == [(2,)]  # one reason, one stack
+    assert store.query("SELECT COUNT(*) FROM reason_index") == [(1,)]
+    assert store.query("SELECT COUNT(*) FROM breaks") == [(3,)]
+
+
+def test_summaries_latest_only(store):
+    store.append("text", "org/a", make_data(with_payloads=False), torch_version="2.6.0")
+    newest = store.append("text", "org/a", make_data(with_payloads=False), torch_version="2.7.0")
+    other = store.append("text", "org/b", make_data(with_payloads=False), torch_version="2.6.0")
+    assert [s.id for s in store.summaries()] == [newest, other]
+    assert len(store.summaries(latest_only=False)) == 3
+    assert len(store.summaries(per_torch_version=True)) == 3
+
+
+def test_merge_from_reinterns_and_reindexes(store, tmp_path):
+    store.append("text", "org/a", make_data(("data dependent operator",), with_payloads=False))
+    shard_path = str(tmp_path / "shard-0.sqlite")
+    with ResultStore(shard_path) as shard:
+        # Interned in a different order than in the main store, so string ids differ
+        shard_id = shard.append("text", "org/b", make_data(
+            ("call_function torch.arange size 13", "data dependent operator")))
+        expected = shard.content_hash(shard_id)
+
+    assert store.merge_from(shard_path) == 1
+    merged_id = store.summaries()[-1].id
+    assert store.content_hash(merged_id) == expected
+    assert store.load(merged_id).break_reasons == make_data(
+        ("call_function torch.arange size 13", "data dependent operator")).break_reasons
+    # The shared reason is stored once; the new one is indexed under its normalized form
+    assert store.query("SELECT COUNT(*) FROM strings WHERE text = 'data dependent operator'") == [(1,)]
+    assert store.query(
+        "SELECT COUNT(*) FROM reason_index i JOIN strings s ON s.id = i.reason_id"
+        " WHERE s.text = 'call_function torch.arange size 13'"
+    ) == [(1,)]
+    assert store.query("SELECT COUNT(*) FROM frame_index") == [(1,)]
+
+
+def test_merge_from_empty_store(store, tmp_path):
+    assert store.merge_from(str(tmp_path / "missing.sqlite")) == 0
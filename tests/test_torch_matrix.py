@@ -0,0 +1,110 @@
+"""
+Version resolution, requirement rewriting and environment fingerprints of torch_matrix.py.
+"""
+
+import os
+
+import pytest
+from packaging.tags import sys_tags
+
+from torch_matrix import (TorchSpec, base_requirements, companion_requirements, env_fingerprint,
+                          resolve_spec)
+
+REQUIREMENTS = """\
+filelock==3.18.0
+Jinja2==3.1.6
+numpy==2.2.4
+sympy==1.13.3
+# tlparse==0.3.39
+torch==2.7.0
+transformers==4.49.0
+typing_extensions==4.12.2
+Jinja2>=3.1.6
+timm>=0.9.0
+"""
+
+
+@pytest.fixture
+def requirements(tmp_path):
+    path = tmp_path / "requirements.txt"
+    path.write_text(REQUIREMENTS)
+    return str(path)
+
+
+@pytest.fixture
+def wheel_dir(tmp_path):
+    """A wheel cache with two releases and two nightlies for this interpreter, and one for another platform."""
+    tag = next(iter(sys_tags()))
+    directory = tmp_path / "wheels"
+    directory.mkdir()
+    for version in ("2.6.0+cpu", "2.7.0+cpu", "2.9.0.dev20250801+cpu", "2.9.0.dev20250802+cpu"):
+        (directory / f"torch-{version}-{tag.interpreter}-{tag.abi}-{tag.platform}.whl").write_bytes(b"wheel")
+    (directory / "torch-2.8.0-cp27-cp27m-win32.whl").write_bytes(b"wheel")
+    (directory / "torch-not-a-wheel.whl").write_bytes(b"wheel")
+    return str(directory)
+
+
+def test_resolve_release_from_cache(wheel_dir):
+    spec = resolve_spec("2.6.0", wheel_dir)
+    assert spec.name == "2.6.0"
+    assert os.path.basename(spec.install[0]).startswith("torch-2.6.0+cpu-")
+
+
+def test_resolve_release_from_pypi(wheel_dir):
+    # Only a wheel for another platform is cached
+    assert resolve_spec("2.8.0", wheel_dir) == TorchSpec("2.8.0", ["torch==2.8.0"])
+
+
+def test_resolve_newest_nightly(wheel_dir):
+    spec = resolve_spec("nightly", wheel_dir)
+    assert spec.name == "2.9.0.dev20250802+cpu"
+    assert "dev20250802" in spec.install[0]
+
+
+def test_resolve_nightly_without_wheels(tmp_path):
+    with pytest.raises(ValueError, match="No nightly"):
+        resolve_spec("nightly", str(tmp_path))
+
+
+def test_resolve_wheel_path(tmp_path):
+    path = tmp_path / "torch-2.9.0.dev20250801+cpu-cp311-cp311-linux_x86_64.whl"
+    assert resolve_spec(str(path)) == TorchSpec("2.9.0.dev20250801+cpu", [str(path)])
+
+
+def test_base_requirements(requirements):
+    assert base_requirements(requirements) == [
+        "filelock", "jinja2", "numpy==2.2.4", "sympy", "transformers==4.49.0", "typing-extensions",
+    ]
+
+
+@pytest.mark.parametrize("torch_version, expected", [
+    ("2.6.0", ["timm>=0.9.0", "torchvision==0.21.0"]),
+    ("2.5.1", ["timm>=0.9.0", "torchvision==0.20.1"]),
+    ("2.7.0+cpu", ["timm>=0.9.0", "torchvision==0.22.0"]),
+    ("2.9.0.dev20250801+cpu", ["timm>=0.9.0", "torchvision"]),
+    ("2.8.0rc1", ["timm>=0.9.0", "torchvision"]),
+    ("nightly-build", ["timm>=0.9.0", "torchvision"]),
+])
+def test_companion_requirements(requirements, torch_version, expected):
+    assert companion_requirements(torch_version, requirements) == expected
+
+
+def test_companion_requirements_keep_explicit_pins(tmp_path):
+    path = tmp_path / "requirements.txt"
+    path.write_text("torchaudio==2.6.0\nnumpy==2.2.4\n")
+    assert companion_requirements("2.7.0", str(path)) == ["torchaudio==2.7.0"]
+    assert companion_requirements("2.9.0.dev20250801", str(path)) == ["torchaudio==2.6.0"]
+
+
+def test_env_fingerprint(tmp_path):
+    wheel = tmp_path / "torch-2.7.0-cp311-cp311-linux_x86_64.whl"
+    wheel.write_bytes(b"wheel")
+    spec = TorchSpec("2.7.0", [str(wheel)])
+    fingerprint = env_fingerprint(spec, ["numpy==2.2.4"])
+
+    assert env_fingerprint(spec, ["numpy==2.2.4"]) == fingerprint
+    assert env_fingerprint(spec, ["numpy==2.2.5"]) != fingerprint
+    assert env_fingerprint(TorchSpec("2.7.0", ["torch==2.7.0"]), ["numpy==2.2.4"]) != fingerprint
+    # A replaced wheel at the same path means a rebuild
+    wheel.write_bytes(b"rebuilt wheel")
+    assert env_fingerprint(spec, ["numpy==2.2.4"]) != fingerprint